@@ -0,0 +1,582 @@
+"""
+End-to-end workload replay with a gateway/backend latency breakdown.
+
+Replays a JSONL workload mixing Orders REST calls, REST-facade sensor calls
+and GraphQL queries at a target rate, either through APIM or against local
+stand-ins (each behind a small local gateway setting the same headers), and
+records for every response:
+
+- client: wall time measured here
+- gateway: `x-api-duration-ms`, set by `all-apis.xml` (APIM inbound to
+  outbound, backend included)
+- correlation id: `x-correlation-id`, set by `all-apis.xml` on the request
+  to the backend and again on the response
+- backend: `Server-Timing: app;dur=`, set by the Orders API, the Python
+  facade and the GraphQL stand-in (absent for Fabric itself)
+
+From those it derives `apim` (gateway - backend) and `network`
+(client - gateway). The report keeps the correlation id of the slowest
+requests: it is the `correlationId` of the `rest-to-graphql-metrics` trace
+and the `Apim-Trace-Id` seen by the backend.
+
+Workload lines (`at` is optional, in seconds from the start, for recorded
+workloads; otherwise requests are spaced evenly at `--rate`):
+
+    {"operation": "orders.get", "api": "orders", "method": "GET", "path": "/orders/ORD-2024-003"}
+    {"operation": "graphql.last_rows", "api": "graphql", "method": "POST", "path": "", "body": {"query": "..."}}
+
+`api` is one of `orders`, `sensors` (REST facade) or `graphql`. Their base
+URLs and subscription keys come from `ORDERS_API_URL` /
+`ORDERS_APIM_SUBSCRIPTION_KEY`, `FABRIC_REST_API_URL` /
+`FABRIC_REST_APIM_SUBSCRIPTION_KEY` and `FABRIC_GRAPHQL_API_URL` /
+`FABRIC_GRAPQL_APIM_SUBSCRIPTION_KEY` (`../.env`), or `--local`.
+
+Writes (REST calls other than GET/HEAD, GraphQL mutations) are only sent to
+the configured APIs with `--allow-writes`; `--local` always allows them.
+
+Usage:
+    python bench_replay.py --generate workload.jsonl --requests 2000
+    python bench_replay.py workload.jsonl --local --rate 100 -o before.json
+    python bench_replay.py workload.jsonl --local --rate 100 -o after.json --baseline before.json
+    python bench_replay.py --generate reads.jsonl --read-only && python bench_replay.py reads.jsonl --rate 50
+"""
+import argparse
+import contextlib
+import hashlib
+import http.client
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # environment variables only
+    load_dotenv = None
+
+ROOT = Path(__file__).resolve().parent.parent
+APIS = {
+    "orders": ("ORDERS_API_URL", "ORDERS_APIM_SUBSCRIPTION_KEY"),
+    "sensors": ("FABRIC_REST_API_URL", "FABRIC_REST_APIM_SUBSCRIPTION_KEY"),
+    "graphql": ("FABRIC_GRAPHQL_API_URL", "FABRIC_GRAPQL_APIM_SUBSCRIPTION_KEY"),
+}
+PERCENTILES = (50, 90, 95, 99)
+DEVICES = ["EM-04A-F3", "EM-05B-G1", "HVAC-01C-H2", "LIGHT-02D-I4"]
+LAST_ROWS_QUERY = "query { factory_iot_datas(first: 10) { items { Timestamp BuildingID DeviceID } } }"
+DEVICE_LATEST_QUERY = (
+    "query ($deviceId: String!) { factory_iot_datas(first: 1, filter: { DeviceID: { eq: $deviceId } }, "
+    "orderBy: { Timestamp: DESC }) { items { Timestamp DeviceID MetricType Value Unit Status } } }"
+)
+_SERVER_TIMING = re.compile(r"(?:^|,)\s*([\w-]+)[^,]*?;\s*dur=([\d.]+)")
+
+
+# ------------------------------
+#    WORKLOAD
+# ------------------------------
+
+def synthetic_workload(count: int, seed: int = 1, writes: bool = True) -> List[Dict[str, Any]]:
+    """A read-heavy mix of Orders, sensor (REST facade) and GraphQL calls (`writes=False` drops order creation)"""
+    rng = random.Random(seed)
+
+    def create_order():
+        return ("orders.create", "orders", "POST", "/orders", {
+            "customer_id": "CUST-001", "customer_name": "Alice Johnson", "customer_email": "alice.johnson@example.com",
+            "items": [{"product_id": "PROD-002", "product_name": "Wireless Mouse", "quantity": 1, "unit_price": 29.99,
+                       "total_price": 29.99}],
+            "shipping_address": "1 Main St",
+        })
+
+    mix = [
+        (0.20, lambda: ("orders.list", "orders", "GET", "/orders?limit=10", None)),
+        (0.20, lambda: ("orders.get", "orders", "GET", f"/orders/ORD-2024-{rng.randint(1, 20):03d}", None)),
+        (0.05, create_order),
+        (0.15, lambda: ("sensors.list", "sensors", "GET", "/sensors", None)),
+        (0.15, lambda: ("sensors.get", "sensors", "GET", f"/sensors/{rng.choice(DEVICES)}", None)),
+        (0.05, lambda: ("sensors.series", "sensors", "GET", f"/sensors/{rng.choice(DEVICES)}/series?step=1h", None)),
+        (0.10, lambda: ("graphql.last_rows", "graphql", "POST", "", {"query": LAST_ROWS_QUERY})),
+        (0.10, lambda: ("graphql.device_latest", "graphql", "POST", "", {
+            "query": DEVICE_LATEST_QUERY, "variables": {"deviceId": rng.choice(DEVICES)},
+        })),
+    ]
+    if not writes:
+        mix = [(weight, make) for weight, make in mix if make is not create_order]
+    weights = [weight for weight, _ in mix]
+    workload = []
+    for _ in range(count):
+        make = rng.choices([m for _, m in mix], weights)[0]
+        operation, api, method, path, body = make()
+        entry = {"operation": operation, "api": api, "method": method, "path": path}
+        if body is not None:
+            entry["body"] = body
+        workload.append(entry)
+    return workload
+
+
+def load_workload(path: Path) -> List[Dict[str, Any]]:
+    with path.open() as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_write(entry: Dict[str, Any]) -> bool:
+    """Whether replaying an entry changes data: a non-GET/HEAD REST call or a GraphQL mutation"""
+    if entry["api"] == "graphql":
+        query = (entry.get("body") or {}).get("query") or ""
+        return query.lstrip().startswith("mutation")
+    return entry.get("method", "GET").upper() not in ("GET", "HEAD")
+
+
+# ------------------------------
+#    TARGETS
+# ------------------------------
+
+@dataclass
+class Target:
+    base_url: str
+    headers: Dict[str, str]
+
+
+def targets_from_env(overrides: Dict[str, Optional[str]]) -> Dict[str, Target]:
+    if load_dotenv is not None:
+        load_dotenv(ROOT / ".env")
+    targets = {}
+    for api, (url_var, key_var) in APIS.items():
+        url = overrides.get(api) or os.getenv(url_var)
+        if url:
+            key = os.getenv(key_var)
+            targets[api] = Target(url.rstrip("/"), {"Ocp-Apim-Subscription-Key": key} if key else {})
+    return targets
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalGateway:
+    """
+    Reverse proxy standing in for APIM: forwards to one backend and sets the
+    headers `all-apis.xml` sets
+
+    Inbound, `User-Agent`, `Ocp-Apim-Trace`, `Apim-Trace-Id` and
+    `x-correlation-id` (one new id for both) on the backend request; outbound,
+    `x-api-duration-ms` and `x-correlation-id` on the response, replacing any
+    the backend sent.
+    """
+
+    def __init__(self, backend_port: int, headers: Optional[Dict[str, str]] = None):
+        gateway = self
+        self.backend_port = backend_port
+        self.headers = headers or {}
+        self._local = threading.local()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _forward(self):
+                start = time.perf_counter()
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                correlation_id = str(uuid.uuid4())
+                inbound = {
+                    "User-Agent": "Azure-API-Management/1.0",
+                    "Ocp-Apim-Trace": "true",
+                    "Apim-Trace-Id": correlation_id,
+                    "x-correlation-id": correlation_id,
+                }
+                headers = {k: v for k, v in self.headers.items()
+                           if k.lower() not in ("host", "connection", *(name.lower() for name in inbound))}
+                status, response_headers, data = gateway.forward(self.command, self.path, body,
+                                                                 {**headers, **gateway.headers, **inbound})
+                self.send_response(status)
+                for name, value in response_headers:
+                    if name.lower() not in ("content-length", "connection", "transfer-encoding", "date", "server",
+                                            "x-api-duration-ms", "x-correlation-id"):
+                        self.send_header(name, value)
+                self.send_header("x-correlation-id", correlation_id)
+                self.send_header("x-api-duration-ms", f"{(time.perf_counter() - start) * 1000:.4f}")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _forward
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+
+    def forward(self, method: str, path: str, body: bytes, headers: Dict[str, str]):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection("127.0.0.1", self.backend_port)
+        connection.request(method, path, body=body or None, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.getheaders(), response.read()
+
+    def start(self) -> "LocalGateway":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class LocalStack:
+    """Orders API, GraphQL stand-in and REST facade as local processes, each behind a `LocalGateway`"""
+
+    def __init__(self, latency_ms: int = 0):
+        self.latency_ms = latency_ms
+        self.ports = {api: free_port() for api in APIS}
+        self.processes: List[subprocess.Popen] = []
+        self.gateways: Dict[str, LocalGateway] = {}
+
+    def targets(self) -> Dict[str, Target]:
+        urls = {api: f"http://127.0.0.1:{gateway.port}" for api, gateway in self.gateways.items()}
+        return {
+            "orders": Target(urls["orders"], {}),
+            "sensors": Target(urls["sensors"], {}),
+            "graphql": Target(urls["graphql"] + "/graphql", {}),
+        }
+
+    def __enter__(self) -> "LocalStack":
+        graphql_url = f"http://127.0.0.1:{self.ports['graphql']}/graphql"
+        self._spawn(
+            [sys.executable, "local_server.py", "--port", str(self.ports["graphql"]), "--latency-ms", str(self.latency_ms)],
+            ROOT / "fabric-graphql",
+        )
+        self._spawn(self._uvicorn(self.ports["orders"]), ROOT / "orders-rest-api")
+        self._spawn(self._uvicorn(self.ports["sensors"]), ROOT / "fabric-rest-2-graphql",
+                    {"FABRIC_GRAPHQL_API_URL": graphql_url, "TELEMETRY_SYNC_INTERVAL": "60", "TELEMETRY_LOOKBACK_DAYS": "0"})
+        for port in self.ports.values():
+            self._wait_for(port)
+        self._wait_for_telemetry()
+        for api, port in self.ports.items():
+            # APIM injects X-Auth-Token for the Orders backend (orders-api-policy.xml)
+            headers = {"X-Auth-Token": "bench-replay"} if api == "orders" else {}
+            self.gateways[api] = LocalGateway(port, headers).start()
+        return self
+
+    def __exit__(self, *exc):
+        for gateway in self.gateways.values():
+            gateway.stop()
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.wait()
+
+    @staticmethod
+    def _uvicorn(port: int) -> List[str]:
+        return [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+
+    def _spawn(self, args: List[str], cwd: Path, env: Optional[Dict[str, str]] = None) -> None:
+        self.processes.append(subprocess.Popen(args, cwd=cwd, env={**os.environ, **(env or {})}))
+
+    @staticmethod
+    def _wait_for(port: int) -> None:
+        for _ in range(500):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"Nothing listening on port {port}")
+
+    def _wait_for_telemetry(self) -> None:
+        """The facade answers `/sensors/{deviceid}/series` once its first telemetry sync is done"""
+        for _ in range(500):
+            connection = http.client.HTTPConnection("127.0.0.1", self.ports["sensors"], timeout=5)
+            try:
+                connection.request("GET", "/health")
+                if json.loads(connection.getresponse().read()).get("telemetry", {}).get("synced"):
+                    return
+            finally:
+                connection.close()
+            time.sleep(0.02)
+        raise RuntimeError("The facade did not load its telemetry")
+
+
+# ------------------------------
+#    REPLAY
+# ------------------------------
+
+@dataclass
+class Sample:
+    operation: str
+    status: int
+    client_ms: float
+    lag_ms: float
+    gateway_ms: Optional[float] = None
+    backend_ms: Optional[float] = None
+    correlation_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+def parse_server_timing(value: Optional[str]) -> Optional[float]:
+    """Duration of the `app` metric of a Server-Timing header (or of the first metric with a duration)"""
+    if not value:
+        return None
+    durations = {name: float(duration) for name, duration in _SERVER_TIMING.findall(value)}
+    if not durations:
+        return None
+    return durations.get("app", next(iter(durations.values())))
+
+
+def _float_header(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class Replayer:
+    """Open-loop replay: requests start on schedule whether or not earlier ones have completed"""
+
+    def __init__(self, targets: Dict[str, Target], concurrency: int = 32, timeout: float = 30.0):
+        self.targets = targets
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def run(self, workload: List[Dict[str, Any]], rate: float, speed: float = 1.0) -> List[Sample]:
+        missing = {entry["api"] for entry in workload} - set(self.targets)
+        if missing:
+            raise ValueError(f"No URL configured for: {', '.join(sorted(missing))}")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = []
+            for index, entry in enumerate(workload):
+                offset = entry["at"] / speed if "at" in entry else index / rate
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(self._send, entry, start + offset))
+            return [future.result() for future in futures]
+
+    def _connection(self, url) -> http.client.HTTPConnection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        key = (url.scheme, url.netloc)
+        if key not in connections:
+            cls = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+            connections[key] = cls(url.netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _send(self, entry: Dict[str, Any], scheduled: float) -> Sample:
+        target = self.targets[entry["api"]]
+        url = urlsplit(target.base_url + entry.get("path", ""))
+        path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        headers = {**target.headers, **entry.get("headers", {})}
+        body = None
+        if entry.get("body") is not None:
+            body = json.dumps(entry["body"]).encode()
+            headers["Content-Type"] = "application/json"
+        begin = time.perf_counter()
+        lag_ms = max(0.0, (begin - scheduled) * 1000)
+        method = entry.get("method", "GET").upper()
+        for attempt in range(2):
+            connection = self._connection(url)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                # A pooled keep-alive connection may have been closed by the server: retry reads once.
+                # Other methods are not retried, as the server may have acted on the request already
+                if (attempt or method not in ("GET", "HEAD")
+                        or not isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError))):
+                    return Sample(entry["operation"], 0, (time.perf_counter() - begin) * 1000, lag_ms,
+                                  error=f"{type(e).__name__}: {e}")
+        return Sample(
+            entry["operation"],
+            response.status,
+            (time.perf_counter() - begin) * 1000,
+            lag_ms,
+            gateway_ms=_float_header(response.getheader("x-api-duration-ms")),
+            backend_ms=parse_server_timing(response.getheader("Server-Timing")),
+            correlation_id=response.getheader("x-correlation-id"),
+        )
+
+
+# ------------------------------
+#    REPORT
+# ------------------------------
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    """Nearest-rank percentiles, mean and max; None without samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    summary = {f"p{q}": round(ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)], 3) for q in PERCENTILES}
+    summary["mean"] = round(sum(ordered) / len(ordered), 3)
+    summary["max"] = round(ordered[-1], 3)
+    summary["samples"] = len(ordered)
+    return summary
+
+
+def _breakdown(samples: List[Sample]) -> Dict[str, Any]:
+    errors = sum(s.error is not None or s.status >= 400 for s in samples)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "client_ms": percentiles([s.client_ms for s in samples]),
+        "gateway_ms": percentiles([s.gateway_ms for s in samples if s.gateway_ms is not None]),
+        "backend_ms": percentiles([s.backend_ms for s in samples if s.backend_ms is not None]),
+        "apim_ms": percentiles([s.gateway_ms - s.backend_ms for s in samples
+                                if s.gateway_ms is not None and s.backend_ms is not None]),
+        "network_ms": percentiles([s.client_ms - s.gateway_ms for s in samples if s.gateway_ms is not None]),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(samples: List[Sample], duration: float, meta: Dict[str, Any], slowest: int = 10) -> Dict[str, Any]:
+    by_operation: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_operation.setdefault(sample.operation, []).append(sample)
+    totals = _breakdown(samples)
+    totals["duration_s"] = round(duration, 3)
+    totals["throughput"] = round(len(samples) / duration, 2) if duration else 0.0
+    totals["lag_ms"] = percentiles([s.lag_ms for s in samples])
+    return {
+        "meta": meta,
+        "totals": totals,
+        "operations": {name: _breakdown(group) for name, group in sorted(by_operation.items())},
+        "slowest": [asdict(s) for s in sorted(samples, key=lambda s: s.client_ms, reverse=True)[:slowest]],
+    }
+
+
+def _cell(summary: Optional[Dict[str, float]], key: str) -> str:
+    return "-" if summary is None else f"{summary[key]:.1f}"
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    meta, totals = report["meta"], report["totals"]
+    lines = [
+        f"commit {meta.get('commit') or '-'}  workload {meta['workload']}  target {meta['target_rate']} req/s",
+        f"{totals['requests']} requests in {totals['duration_s']:.1f}s: {totals['throughput']:.1f} req/s, "
+        f"error rate {totals['error_rate']:.2%}, schedule lag p95 {_cell(totals['lag_ms'], 'p95')} ms",
+        "",
+        f"{'operation':<24}{'n':>6}{'err%':>7}{'client p50':>12}{'p95':>8}{'p99':>8}"
+        f"{'gateway p50':>13}{'p95':>8}{'backend p50':>13}{'p95':>8}{'apim p50':>10}",
+    ]
+    for name, op in [*report["operations"].items(), ("TOTAL", totals)]:
+        client, gateway, backend = op["client_ms"], op["gateway_ms"], op["backend_ms"]
+        lines.append(
+            f"{name:<24}{op['requests']:>6}{op['error_rate'] * 100:>7.1f}"
+            f"{_cell(client, 'p50'):>12}{_cell(client, 'p95'):>8}{_cell(client, 'p99'):>8}"
+            f"{_cell(gateway, 'p50'):>13}{_cell(gateway, 'p95'):>8}"
+            f"{_cell(backend, 'p50'):>13}{_cell(backend, 'p95'):>8}{_cell(op['apim_ms'], 'p50'):>10}"
+        )
+    if baseline is not None:
+        lines += ["", f"vs baseline {baseline['meta'].get('commit') or '-'} (client ms)"]
+        base_ops = {**baseline["operations"], "TOTAL": baseline["totals"]}
+        for name, op in [*report["operations"].items(), ("TOTAL", totals)]:
+            base = base_ops.get(name)
+            if base is None or base["client_ms"] is None or op["client_ms"] is None:
+                continue
+            deltas = []
+            for key in ("p50", "p95"):
+                before, after = base["client_ms"][key], op["client_ms"][key]
+                change = f"{(after - before) / before:+.0%}" if before else "n/a"
+                deltas.append(f"{key} {before:.1f} -> {after:.1f} ({change})")
+            errors = f"errors {base['error_rate']:.2%} -> {op['error_rate']:.2%}"
+            lines.append(f"{name:<24}{'   '.join(deltas)}   {errors}")
+    if report["slowest"]:
+        lines += ["", "slowest requests (x-correlation-id):"]
+        for s in report["slowest"][:5]:
+            lines.append(f"  {s['operation']:<24}{s['client_ms']:>9.1f} ms  {s['status']}  {s['correlation_id'] or '-'}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workload", nargs="?", type=Path, help="JSONL workload to replay")
+    parser.add_argument("--generate", type=Path, help="Write a synthetic workload to this file and exit")
+    parser.add_argument("--requests", type=int, default=1000, help="Size of the generated workload")
+    parser.add_argument("--read-only", action="store_true", help="Generate a workload without writes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=50.0, help="Target request rate (req/s)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time scale for workloads with recorded `at` offsets")
+    parser.add_argument("--concurrency", type=int, default=32, help="Maximum requests in flight")
+    parser.add_argument("--local", action="store_true",
+                        help="Start the Orders API, GraphQL stand-in and facade locally, behind a local gateway")
+    parser.add_argument("--local-latency-ms", type=int, default=0, help="Latency added by the GraphQL stand-in")
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="Replay writes (such as orders.create) against the configured, non-local APIs")
+    parser.add_argument("--orders-url")
+    parser.add_argument("--sensors-url")
+    parser.add_argument("--graphql-url")
+    parser.add_argument("-o", "--output", type=Path, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", type=Path, help="JSON report of a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        with args.generate.open("w") as f:
+            for entry in synthetic_workload(args.requests, args.seed, writes=not args.read_only):
+                f.write(json.dumps(entry) + "\n")
+        print(f"Wrote {args.requests} requests to {args.generate}")
+        return
+    if args.workload is None:
+        parser.error("a workload file (or --generate) is required")
+
+    workload = load_workload(args.workload)
+    writes = sorted({entry["operation"] for entry in workload if is_write(entry)})
+    if writes and not args.local and not args.allow_writes:
+        parser.error(f"the workload writes ({', '.join(writes)}); pass --allow-writes to send them to the "
+                     "configured APIs, or use --local (or a --read-only workload)")
+    meta = {
+        "commit": _git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "workload": str(args.workload),
+        "workload_sha256": hashlib.sha256(args.workload.read_bytes()).hexdigest(),
+        "target_rate": args.rate,
+        "concurrency": args.concurrency,
+        "local": args.local,
+    }
+    with LocalStack(args.local_latency_ms) if args.local else contextlib.nullcontext() as stack:
+        if stack is not None:
+            targets = stack.targets()
+        else:
+            targets = targets_from_env({"orders": args.orders_url, "sensors": args.sensors_url, "graphql": args.graphql_url})
+        start = time.perf_counter()
+        samples = Replayer(targets, args.concurrency).run(workload, args.rate, args.speed)
+        duration = time.perf_counter() - start
+    meta["targets"] = {api: target.base_url for api, target in targets.items()}
+
+    report = build_report(samples, duration, meta)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print(format_report(report, baseline))
+
+
+if __name__ == "__main__":
+    main()
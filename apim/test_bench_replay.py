@@ -0,0 +1,166 @@
+"""
+Tests for the end-to-end replay benchmark
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+import pytest
+
+from bench_replay import (
+    LocalGateway,
+    Replayer,
+    Sample,
+    Target,
+    _breakdown,
+    build_report,
+    format_report,
+    is_write,
+    main,
+    parse_server_timing,
+    percentiles,
+    synthetic_workload,
+)
+
+
+def test_parse_server_timing():
+    assert parse_server_timing("app;dur=12.5") == 12.5
+    assert parse_server_timing('db;dur=3, app;desc="facade";dur=7.25') == 7.25
+    assert parse_server_timing("cache;dur=2") == 2.0
+    assert parse_server_timing("app") is None
+    assert parse_server_timing(None) is None
+
+
+def test_percentiles_use_nearest_rank():
+    summary = percentiles([float(v) for v in range(100, 0, -1)])
+    assert (summary["p50"], summary["p90"], summary["p95"], summary["p99"]) == (50.0, 90.0, 95.0, 99.0)
+    assert (summary["mean"], summary["max"], summary["samples"]) == (50.5, 100.0, 100)
+    assert percentiles([3.0])["p99"] == 3.0
+    assert percentiles([]) is None
+
+
+def test_breakdown_splits_gateway_backend_and_network():
+    samples = [
+        Sample("orders.get", 200, client_ms=30.0, lag_ms=0.0, gateway_ms=20.0, backend_ms=15.0),
+        Sample("orders.get", 500, client_ms=50.0, lag_ms=0.0, gateway_ms=40.0),
+        Sample("orders.get", 0, client_ms=5.0, lag_ms=0.0, error="ConnectionRefusedError"),
+    ]
+    breakdown = _breakdown(samples)
+    assert (breakdown["requests"], breakdown["errors"], breakdown["error_rate"]) == (3, 2, 0.6667)
+    assert breakdown["apim_ms"]["samples"] == 1 and breakdown["apim_ms"]["p50"] == 5.0
+    assert breakdown["backend_ms"]["samples"] == 1
+    assert [breakdown["network_ms"][k] for k in ("p50", "max")] == [10.0, 10.0]
+
+
+def test_format_report_compares_with_the_baseline():
+    meta = {"commit": "abc1234", "workload": "w.jsonl", "target_rate": 10}
+    before = build_report([Sample("sensors.get", 200, 10.0, 0.0), Sample("sensors.get", 200, 10.0, 0.0)], 1.0, meta)
+    after = build_report([Sample("sensors.get", 200, 20.0, 0.0, correlation_id="c-1"),
+                          Sample("sensors.get", 503, 20.0, 0.0)], 1.0, {**meta, "commit": "def5678"})
+    text = format_report(after, before)
+    assert "vs baseline abc1234" in text
+    assert "p50 10.0 -> 20.0 (+100%)" in text
+    assert "errors 0.00% -> 50.00%" in text
+    assert "c-1" in text
+    assert "vs baseline" not in format_report(after)
+
+
+def test_writes_are_detected_and_can_be_left_out():
+    assert is_write({"api": "orders", "method": "POST", "path": "/orders"})
+    assert not is_write({"api": "orders", "method": "GET", "path": "/orders"})
+    assert not is_write({"api": "graphql", "method": "POST", "body": {"query": "query { x }"}})
+    assert is_write({"api": "graphql", "method": "POST", "body": {"query": " mutation { x }"}})
+    assert any(is_write(e) for e in synthetic_workload(200))
+    assert not any(is_write(e) for e in synthetic_workload(200, writes=False))
+    assert synthetic_workload(50, seed=3) == synthetic_workload(50, seed=3)
+
+
+def test_writes_need_a_flag_outside_local(tmp_path):
+    workload = tmp_path / "workload.jsonl"
+    workload.write_text(json.dumps({"operation": "orders.create", "api": "orders", "method": "POST",
+                                    "path": "/orders", "body": {}}) + "\n")
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(workload), "--orders-url", "http://127.0.0.1:9"])
+    assert exit_info.value.code == 2
+
+
+def test_local_gateway_sets_apim_headers_and_forwards_backend_ones():
+    class Backend(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = json.dumps({"token": self.headers.get("X-Auth-Token"), "path": self.path,
+                               "trace_id": self.headers.get("Apim-Trace-Id"),
+                               "correlation_id": self.headers.get("x-correlation-id"),
+                               "user_agent": self.headers.get("User-Agent")}).encode()
+            self.send_response(200)
+            self.send_header("Server-Timing", "app;dur=1.5")
+            self.send_header("x-correlation-id", "from-backend")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    backend = ThreadingHTTPServer(("127.0.0.1", 0), Backend)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    gateway = LocalGateway(backend.server_address[1], {"X-Auth-Token": "secret"}).start()
+    try:
+        request = Request(f"http://127.0.0.1:{gateway.port}/orders?limit=1", headers={"x-correlation-id": "mine"})
+        with urlopen(request, timeout=5) as response:
+            headers, body = response.headers, json.loads(response.read())
+    finally:
+        gateway.stop()
+        backend.shutdown()
+        backend.server_close()
+    correlation_id = headers["x-correlation-id"]
+    assert correlation_id not in ("mine", "from-backend")
+    assert headers.get_all("x-correlation-id") == [correlation_id]
+    assert body == {"token": "secret", "path": "/orders?limit=1", "trace_id": correlation_id,
+                    "correlation_id": correlation_id, "user_agent": "Azure-API-Management/1.0"}
+    assert parse_server_timing(headers["Server-Timing"]) == 1.5
+    assert float(headers["x-api-duration-ms"]) >= 0
+
+
+def test_only_reads_are_retried_on_a_dropped_connection():
+    received = []
+
+    class Dropping(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _drop(self):
+            received.append(self.command)
+            self.close_connection = True
+
+        do_GET = do_POST = _drop
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Dropping)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    replayer = Replayer({"orders": Target(f"http://127.0.0.1:{server.server_address[1]}", {})}, concurrency=1)
+    try:
+        create, get = replayer.run([
+            {"operation": "orders.create", "api": "orders", "method": "POST", "path": "/orders", "body": {}},
+            {"operation": "orders.get", "api": "orders", "method": "GET", "path": "/orders/ORD-1"},
+        ], rate=1000)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert create.error and get.error
+    assert received == ["POST", "GET", "GET"]
+
+
+def test_local_replay_smoke(tmp_path, capsys):
+    workload, report = tmp_path / "workload.jsonl", tmp_path / "report.json"
+    main(["--generate", str(workload), "--requests", "40", "--seed", "2"])
+    main([str(workload), "--local", "--rate", "40", "-o", str(report)])
+    result = json.loads(report.read_text())
+    assert result["totals"]["requests"] == 40
+    assert result["totals"]["errors"] == 0
+    assert result["totals"]["gateway_ms"]["samples"] == 40
+    assert result["totals"]["backend_ms"]["samples"] == 40
+    assert "TOTAL" in capsys.readouterr().out
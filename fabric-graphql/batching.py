@@ -0,0 +1,163 @@
+"""
+DataLoader-style batching for per-device telemetry lookups.
+
+`GET /sensors/{deviceId}` (see `fabric-rest-to-graphql-policy-base-sensors-details.xml`)
+issues one `factory_iot_datas(first: 1, filter: { DeviceID: { eq: $deviceId } })`
+round trip per device. `DeviceLoader` collects lookups made within a short window
+and sends them as a single query made of aliased sub-queries, one per distinct
+device, then fans each result back out to its callers. Aliases keep the exact
+`first: 1` semantics of the policy, which a single `DeviceID: { in: [...] }`
+filter cannot guarantee per device.
+"""
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from graphql_client import FabricGraphQLClient
+
+DEFAULT_FIELDS = (
+    "Timestamp",
+    "BuildingID",
+    "DeviceID",
+    "Location",
+    "MetricType",
+    "Value",
+    "Unit",
+    "Status",
+)
+
+
+@dataclass
+class LoaderStats:
+    """Counters exposed by `DeviceLoader`"""
+    loads: int = 0
+    deduplicated: int = 0
+    batches: int = 0
+
+
+def build_batch_query(count: int, fields: Sequence[str] = DEFAULT_FIELDS) -> str:
+    """Build one query with `count` aliased `first: 1` lookups (`d0`, `d1`, ...)"""
+    selection = " ".join(fields)
+    variables = ", ".join(f"$d{i}: String!" for i in range(count))
+    lookups = "\n".join(
+        f"  d{i}: factory_iot_datas(first: 1, filter: {{ DeviceID: {{ eq: $d{i} }} }}) {{ items {{ {selection} }} }}"
+        for i in range(count)
+    )
+    return f"query DeviceBatch({variables}) {{\n{lookups}\n}}"
+
+
+class DeviceLoader:
+    """
+    Coalesce concurrent per-device lookups into batched GraphQL requests.
+
+    A batch is dispatched `window_ms` after its first lookup, or as soon as it
+    holds `max_batch_size` distinct devices. Either way it is sent from a
+    background thread, so `submit` never waits for a round trip and full
+    batches go out concurrently. Lookups for a device already pending or in
+    flight share the same future instead of adding a sub-query.
+
+    Args:
+        client: Client used to send the batched queries
+        fields: `factory_iot_data` fields to select
+        window_ms: How long to collect lookups before dispatching a batch
+        max_batch_size: Maximum number of distinct devices per request
+    """
+
+    def __init__(
+        self,
+        client: FabricGraphQLClient,
+        fields: Sequence[str] = DEFAULT_FIELDS,
+        window_ms: float = 5.0,
+        max_batch_size: int = 100,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.client = client
+        self.fields = tuple(fields)
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.stats = LoaderStats()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._timer: Optional[threading.Timer] = None
+
+    def submit(self, device_id: str) -> Future:
+        """Schedule a lookup and return a future resolving to the item (or None)"""
+        batch = None
+        with self._lock:
+            self.stats.loads += 1
+            future = self._pending.get(device_id) or self._inflight.get(device_id)
+            if future is not None:
+                self.stats.deduplicated += 1
+                return future
+            future = Future()
+            self._pending[device_id] = future
+            if len(self._pending) >= self.max_batch_size:
+                batch = self._take_batch()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._dispatch_in_background(batch)
+        return future
+
+    def load(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Return the `first: 1` item for a device, batching with concurrent callers"""
+        return self.submit(device_id).result()
+
+    def load_many(self, device_ids: Iterable[str]) -> List[Optional[Dict[str, Any]]]:
+        """Look up several devices; they share batches with each other and other callers"""
+        futures = [self.submit(device_id) for device_id in device_ids]
+        self.flush()
+        return [future.result() for future in futures]
+
+    def flush(self) -> None:
+        """Dispatch the pending batch immediately"""
+        with self._lock:
+            batch = self._take_batch()
+        if batch:
+            self._dispatch(batch)
+
+    def _take_batch(self) -> Dict[str, Future]:
+        """Move pending lookups to in-flight; caller must hold the lock"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        self._inflight.update(batch)
+        if batch:
+            self.stats.batches += 1
+        return batch
+
+    def _dispatch_in_background(self, batch: Dict[str, Future]) -> None:
+        thread = threading.Thread(target=self._dispatch, args=(batch,), daemon=True)
+        thread.start()
+
+    def _dispatch(self, batch: Dict[str, Future]) -> None:
+        device_ids = list(batch)
+        try:
+            data = self.client.execute(
+                build_batch_query(len(device_ids), self.fields),
+                {f"d{i}": device_id for i, device_id in enumerate(device_ids)},
+            )
+            results = {
+                device_id: next(iter(data[f"d{i}"]["items"]), None)
+                for i, device_id in enumerate(device_ids)
+            }
+        except Exception as error:
+            self._resolve(batch, error=error)
+        else:
+            self._resolve(batch, results=results)
+
+    def _resolve(self, batch: Dict[str, Future], results=None, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            for device_id in batch:
+                self._inflight.pop(device_id, None)
+        for device_id, future in batch.items():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[device_id])
@@ -0,0 +1,69 @@
+"""
+Benchmark: per-device lookups with and without `DeviceLoader`.
+
+Simulates a dashboard resolving the latest reading of N devices from a pool
+of concurrent workers against the local stand-in, and reports backend round
+trips and wall time for both paths.
+
+Usage:
+    python bench_batching.py --devices 200 --latency-ms 20 --workers 32
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import DEFAULT_FIELDS, DeviceLoader
+from graphql_client import FabricGraphQLClient
+from local_server import LocalGraphQLServer, synthetic_rows
+
+SINGLE_QUERY = """
+query ($deviceId: String!) {
+  factory_iot_datas(first: 1, filter: { DeviceID: { eq: $deviceId } }) {
+    items { %s }
+  }
+}
+""" % " ".join(DEFAULT_FIELDS)
+
+
+def run(server, lookup, device_ids, workers):
+    server.reset_stats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lookup, device_ids))
+    return time.perf_counter() - start, server.request_count, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=2, help="Lookups per device (duplicates are coalesced)")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    device_ids = [f"DEV-{i:05d}" for i in range(args.devices) for _ in range(args.repeat)]
+    with LocalGraphQLServer(synthetic_rows(args.devices), latency_ms=args.latency_ms) as server:
+        client = FabricGraphQLClient(server.url)
+
+        def single(device_id):
+            items = client.execute(SINGLE_QUERY, {"deviceId": device_id})["factory_iot_datas"]["items"]
+            return items[0] if items else None
+
+        loader = DeviceLoader(client, window_ms=args.window_ms)
+        naive_time, naive_trips, naive_results = run(server, single, device_ids, args.workers)
+        batched_time, batched_trips, batched_results = run(server, loader.load, device_ids, args.workers)
+
+    assert naive_results == batched_results, "batched results differ from per-device results"
+    print(f"{len(device_ids)} lookups over {args.devices} devices, {args.latency_ms:.0f} ms backend latency")
+    print(f"{'path':<10}{'round trips':>14}{'wall time (s)':>16}")
+    print(f"{'naive':<10}{naive_trips:>14}{naive_time:>16.3f}")
+    print(f"{'batched':<10}{batched_trips:>14}{batched_time:>16.3f}")
+    print(
+        f"round trips reduced {naive_trips / max(batched_trips, 1):.1f}x, "
+        f"{loader.stats.deduplicated} duplicate lookups coalesced"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: repeated telemetry queries with and without `ResultCache`.
+
+Replays a mix of the queries scripts and the REST facade send constantly
+(last 10 rows, latest value per device, per-building aggregation), in
+textually different but equivalent forms, against the local stand-in.
+
+Usage:
+    python bench_cache.py --requests 500 --latency-ms 10
+"""
+import argparse
+import random
+import statistics
+import time
+
+from graphql_client import FabricGraphQLClient
+from local_server import LocalGraphQLServer
+from result_cache import ResultCache
+
+LAST_ROWS = [
+    "query { factory_iot_datas(first: 10) { items { Timestamp BuildingID DeviceID } } }",
+    """query {
+        factory_iot_datas(first: 10) {
+            items {
+                DeviceID
+                BuildingID
+                Timestamp
+            }
+        }
+    }""",
+]
+DEVICE_LATEST = [
+    """query ($deviceId: String!) {
+        factory_iot_datas(first: 1, filter: { DeviceID: { eq: $deviceId } }) {
+            items { Timestamp DeviceID MetricType Value Unit Status }
+        }
+    }""",
+    "query ($deviceId: String!) { factory_iot_datas(filter: {DeviceID: {eq: $deviceId}}, first: 1) "
+    "{ items { DeviceID: DeviceID Timestamp MetricType Value Unit Status } } }",
+]
+BUILDING_AGGREGATES = [
+    """query {
+        factory_iot_datas(first: 1) {
+            groupBy(fields: [BuildingID, MetricType]) {
+                fields { BuildingID MetricType }
+                aggregations { avg(field: Value) max(field: Value) count(field: Value) }
+            }
+        }
+    }""",
+]
+DEVICES = ["EM-04A-F3", "EM-05B-G1", "HVAC-01C-H2", "LIGHT-02D-I4"]
+
+
+def workload(count, seed=7):
+    rng = random.Random(seed)
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            yield rng.choice(LAST_ROWS), {}
+        elif kind < 0.9:
+            yield rng.choice(DEVICE_LATEST), {"deviceId": rng.choice(DEVICES)}
+        else:
+            yield rng.choice(BUILDING_AGGREGATES), {}
+
+
+def run(client, requests):
+    latencies = []
+    for query, variables in requests:
+        start = time.perf_counter()
+        client.execute(query, variables)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--ttl", type=float, default=30.0)
+    args = parser.parse_args()
+
+    requests = list(workload(args.requests))
+    with LocalGraphQLServer(latency_ms=args.latency_ms) as server:
+        uncached = run(FabricGraphQLClient(server.url), requests)
+        uncached_trips = server.request_count
+
+        server.reset_stats()
+        cache = ResultCache(default_ttl=args.ttl)
+        cached = run(FabricGraphQLClient(server.url, cache=cache), requests)
+        cached_trips = server.request_count
+
+    print(f"{args.requests} requests, {args.latency_ms:.0f} ms backend latency")
+    print(f"{'path':<10}{'round trips':>13}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stats, trips in (("uncached", uncached, uncached_trips), ("cached", cached, cached_trips)):
+        print(f"{name:<10}{trips:>13}{stats['mean']:>10.3f}{stats['p50']:>10.3f}{stats['p95']:>10.3f}")
+    print(
+        f"hits={cache.stats.hits} misses={cache.stats.misses} "
+        f"hit ratio={cache.stats.hit_ratio:.1%} entries={len(cache)} bytes={cache.size_bytes}"
+    )
+
+
+if __name__ == "__main__":
+    main()
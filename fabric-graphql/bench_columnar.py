@@ -0,0 +1,96 @@
+"""
+Benchmark: keeping large `factory_iot_datas` pages as dicts versus as
+`ColumnarDecoder` typed columns.
+
+Pages are serialized once up front from synthetic telemetry, like a server
+would send them. Each path then decodes every page and keeps all the rows,
+as a script paging through the table would:
+
+- dicts: `json.loads`, keeping the item dicts
+- columnar: `ColumnarDecoder.decode` (`json.loads`, then the page's items
+  moved to typed columns)
+
+Memory is the tracemalloc peak of that run.
+
+Usage:
+    python bench_columnar.py --rows 200000 --page-size 5000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from columnar import ColumnarDecoder
+from local_server import synthetic_rows
+
+QUERY = """query ($first: Int!, $after: String) {
+    factory_iot_datas(first: $first, after: $after) {
+        items { Timestamp BuildingID DeviceID Location MetricType Value Unit Status }
+        hasNextPage
+        endCursor
+    }
+}"""
+FIELDS = ["Timestamp", "BuildingID", "DeviceID", "Location", "MetricType", "Value", "Unit", "Status"]
+
+
+def build_pages(rows, page_size):
+    pages = []
+    for offset in range(0, len(rows), page_size):
+        items = [{field: row[field] for field in FIELDS} for row in rows[offset:offset + page_size]]
+        connection = {"items": items, "hasNextPage": offset + page_size < len(rows), "endCursor": str(offset)}
+        pages.append(json.dumps({"data": {"factory_iot_datas": connection}}).encode())
+    return pages
+
+
+def decode_dicts(pages):
+    rows = []
+    for body in pages:
+        rows.extend(json.loads(body)["data"]["factory_iot_datas"]["items"])
+    return rows
+
+
+def decode_columns(pages):
+    decoder = ColumnarDecoder(QUERY)
+    for body in pages:
+        decoder.decode(body)
+    return decoder
+
+
+def measure(decode, pages, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(pages)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = decode(pages)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return rows / best, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.devices, max(1, args.rows // args.devices))
+    pages = build_pages(rows, args.page_size)
+    columns, dicts = decode_columns(pages[:1]), decode_dicts(pages[:1])
+    assert columns["DeviceID"].to_list() == [item["DeviceID"] for item in dicts]
+
+    size = sum(len(page) for page in pages) / 2 ** 20
+    print(f"{len(rows)} rows in {len(pages)} pages of {args.page_size} ({size:.1f} MiB of JSON)")
+    print(f"{'path':<15}{'rows/s':>14}{'peak MiB':>12}")
+    paths = (("dicts", decode_dicts), ("columnar", decode_columns))
+    for name, decode in paths:
+        rate, peak = measure(decode, pages, len(rows), args.repeat)
+        print(f"{name:<15}{rate:>14,.0f}{peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
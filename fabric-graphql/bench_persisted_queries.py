@@ -0,0 +1,66 @@
+"""
+Benchmark: bytes on the wire and parse time with persisted queries.
+
+Replays the `bench_cache.py` workload against the local stand-in three ways:
+full query text, hashes with automatic registration on a miss, and hashes
+preloaded from the build-time manifest. Then compares the stand-in's
+parse + validate time per request with and without its document cache.
+
+Usage:
+    python bench_persisted_queries.py --requests 500
+"""
+import argparse
+import time
+
+from bench_cache import workload
+from graphql_client import FabricGraphQLClient
+from local_server import LocalGraphQLServer
+from persisted_queries import build_manifest, default_sources
+
+
+def replay(server, client, requests):
+    server.reset_stats()
+    for query, variables in requests:
+        client.execute(query, variables)
+    return server.request_count, server.bytes_received
+
+
+def document_time_us(server, requests):
+    start = time.perf_counter()
+    for query, _ in requests:
+        server._document(query)
+    return (time.perf_counter() - start) / len(requests) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    requests = list(workload(args.requests))
+    manifest = build_manifest(default_sources())
+
+    rows = []
+    with LocalGraphQLServer() as server:
+        rows.append(("full text", *replay(server, FabricGraphQLClient(server.url), requests)))
+        rows.append(("hash (APQ)", *replay(server, FabricGraphQLClient(server.url, persisted_queries=True), requests)))
+    with LocalGraphQLServer(persisted_queries=manifest) as server:
+        rows.append(("hash (manifest)", *replay(server, FabricGraphQLClient(server.url, persisted_queries=True), requests)))
+
+    print(f"{args.requests} requests, manifest of {len(manifest)} operations")
+    print(f"{'mode':<18}{'round trips':>13}{'request bytes':>15}{'bytes/request':>15}")
+    for name, trips, received in rows:
+        print(f"{name:<18}{trips:>13}{received:>15}{received / args.requests:>15.1f}")
+    print(f"request bytes saved with manifest: {1 - rows[2][2] / rows[0][2]:.1%}")
+
+    uncached = LocalGraphQLServer(document_cache_size=0)
+    cached = LocalGraphQLServer()
+    document_time_us(cached, requests)
+    cold, warm = document_time_us(uncached, requests), document_time_us(cached, requests)
+    for server in (uncached, cached):
+        server._httpd.server_close()
+    print(f"parse + validate per request: {cold:.1f} us uncached, {warm:.2f} us cached ({cold / warm:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Columnar decoding of `factory_iot_datas` pages.
+
+Keeping `response.json()` pages around costs one dict per row (and a str per
+value). `ColumnarDecoder` uses the query's selection set and
+`factory_schema.graphql` to move each page of `data.factory_iot_datas.items`
+into typed columns as soon as it is parsed, so only one page of dicts is
+alive at a time:
+
+- DateTime fields: epoch milliseconds in an `array("q")`
+- Float/Int fields: an `array("d")`, NaN for null
+- String/ID fields: categorical codes in an `array("i")` (-1 for null) plus a
+  table of distinct values
+- Boolean fields: an `array("b")`, -1 for null
+
+Usage:
+    decoder = ColumnarDecoder(QUERY)
+    columns = fetch_columns(client, QUERY, decoder=decoder, page_size=5000)
+    columns["Value"].values   # array('d', [...])
+"""
+import json
+import math
+import re
+from array import array
+from calendar import timegm
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from graphql import FieldNode, GraphQLSchema, OperationDefinitionNode, build_schema, get_named_type, parse
+
+from graphql_client import FabricGraphQLClient, GraphQLError
+from query_cost import SCHEMA_PATH
+
+TIMESTAMP_NULL = -(2 ** 63)
+
+_KINDS = {"DateTime": "timestamp", "Float": "float", "Int": "float", "String": "category", "ID": "category",
+          "Boolean": "bool"}
+_TYPECODES = {"timestamp": "q", "float": "d", "category": "i", "bool": "b"}
+_ISO_UTC = re.compile(r"(\d{4}-\d\d-\d\dT\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?Z")
+
+
+@lru_cache(maxsize=4096)
+def _hour_epoch_ms(hour: str) -> int:
+    return timegm(datetime.strptime(hour, "%Y-%m-%dT%H").timetuple()) * 1000
+
+
+def parse_timestamp(text: str) -> int:
+    """Epoch milliseconds of a DateTime value (`2025-11-11T17:36:24.407Z`)"""
+    if len(text) == 24 and text[23] == "Z" and text[19] == ".":
+        # Fabric's own layout: slice instead of running the regex
+        try:
+            return _hour_epoch_ms(text[:13]) + int(text[14:16]) * 60000 + int(text[17:19] + text[20:23])
+        except ValueError:
+            pass
+    match = _ISO_UTC.fullmatch(text)
+    if match:
+        hour, minutes, seconds, fraction = match.groups()
+        millis = int((fraction or "0").ljust(3, "0")[:3])
+        return _hour_epoch_ms(hour) + int(minutes) * 60000 + int(seconds) * 1000 + millis
+    value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+class Column:
+    """Typed values of one selected field"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.values = array(_TYPECODES[kind])
+        # Categorical columns: distinct values in order of first appearance, and their codes
+        self.categories: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def extend_values(self, values: List[Any]) -> None:
+        """Append decoded JSON values (None for null)"""
+        if self.kind == "float":
+            self.values.extend(math.nan if v is None else float(v) for v in values)
+        elif self.kind == "category":
+            self.values.extend(self._code(v) for v in values)
+        elif self.kind == "timestamp":
+            self.values.extend(TIMESTAMP_NULL if v is None else parse_timestamp(v) for v in values)
+        else:
+            self.values.extend(-1 if v is None else int(v) for v in values)
+
+    def _code(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def decode(self, index: int) -> Any:
+        """Python value at `index` (for inspection; vectorized code should read `values`)"""
+        value = self.values[index]
+        if self.kind == "category":
+            return None if value < 0 else self.categories[value]
+        if self.kind == "timestamp":
+            return None if value == TIMESTAMP_NULL else datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+        if self.kind == "float":
+            return None if math.isnan(value) else value
+        return None if value < 0 else bool(value)
+
+    def to_list(self) -> List[Any]:
+        return [self.decode(i) for i in range(len(self.values))]
+
+
+@dataclass
+class PageInfo:
+    rows: int
+    has_next_page: bool
+    end_cursor: Optional[str]
+
+
+class ColumnarDecoder:
+    """
+    Decode pages of one query into columns, accumulating across pages.
+
+    Args:
+        query: Query whose `items` selection defines the columns
+        schema: Schema used to type the selected fields (defaults to `factory_schema.graphql`)
+        connection_field: Root field returning the paged connection
+    """
+
+    def __init__(self, query: str, schema: Optional[GraphQLSchema] = None, connection_field: str = "factory_iot_datas"):
+        self.connection_field = connection_field
+        self.fields = _item_fields(parse(query), schema or _default_schema(), connection_field)
+        self.columns: Dict[str, Column] = {key: Column(key, kind) for key, kind in self.fields}
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, key: str) -> Column:
+        return self.columns[key]
+
+    def extend_items(self, items: List[Dict[str, Any]]) -> None:
+        """Append items that were already decoded as dicts"""
+        for key, _ in self.fields:
+            self.columns[key].extend_values([item.get(key) for item in items])
+
+    def decode(self, body: Union[bytes, str]) -> PageInfo:
+        """Append the items of one response body to the columns"""
+        page = json.loads(body)
+        if page.get("errors"):
+            raise GraphQLError(page["errors"])
+        connection = (page.get("data") or {}).get(self.connection_field) or {}
+        items = connection.get("items") or []
+        self.extend_items(items)
+        return PageInfo(len(items), bool(connection.get("hasNextPage")), connection.get("endCursor"))
+
+
+def fetch_columns(
+    client: FabricGraphQLClient,
+    query: str,
+    variables: Optional[Dict[str, Any]] = None,
+    decoder: Optional[ColumnarDecoder] = None,
+    page_size: int = 1000,
+    max_pages: Optional[int] = None,
+) -> ColumnarDecoder:
+    """
+    Page through a `$first`/`$after` query and decode every page into columns.
+
+    Only the raw bytes of the current page are held in memory.
+    """
+    decoder = decoder or ColumnarDecoder(query)
+    for _ in iter_pages(client, query, decoder, variables, page_size, max_pages):
+        pass
+    return decoder
+
+
+def iter_pages(
+    client: FabricGraphQLClient,
+    query: str,
+    decoder: ColumnarDecoder,
+    variables: Optional[Dict[str, Any]] = None,
+    page_size: int = 1000,
+    max_pages: Optional[int] = None,
+) -> Iterator[PageInfo]:
+    """Like `fetch_columns`, yielding the `PageInfo` of each page as it is decoded"""
+    variables = {**(variables or {}), "first": page_size, "after": None}
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        page = decoder.decode(client.execute_raw(query, variables))
+        pages += 1
+        yield page
+        if not page.has_next_page or not page.end_cursor:
+            break
+        variables["after"] = page.end_cursor
+
+
+@lru_cache(maxsize=1)
+def _default_schema() -> GraphQLSchema:
+    return build_schema(SCHEMA_PATH.read_text())
+
+
+def _item_fields(document, schema: GraphQLSchema, connection_field: str) -> List[Tuple[str, str]]:
+    """(response key, column kind) of each field selected under `<connection_field> { items { ... } }`"""
+    operation = next(d for d in document.definitions if isinstance(d, OperationDefinitionNode))
+    root = schema.query_type
+    for selection in operation.selection_set.selections:
+        if isinstance(selection, FieldNode) and selection.name.value == connection_field:
+            connection_type = get_named_type(root.fields[connection_field].type)
+            items = next(
+                (s for s in selection.selection_set.selections if isinstance(s, FieldNode) and s.name.value == "items"),
+                None,
+            )
+            if items is None:
+                raise ValueError(f"Query does not select {connection_field} {{ items }}")
+            item_type = get_named_type(connection_type.fields["items"].type)
+            fields = []
+            for field in items.selection_set.selections:
+                if not isinstance(field, FieldNode):
+                    raise ValueError("Fragments are not supported in the items selection")
+                field_type = get_named_type(item_type.fields[field.name.value].type)
+                if field_type.name not in _KINDS:
+                    raise ValueError(f"Field {field.name.value} of type {field_type.name} cannot be a column")
+                fields.append(((field.alias or field.name).value, _KINDS[field_type.name]))
+            return fields
+    raise ValueError(f"Query does not select {connection_field}")
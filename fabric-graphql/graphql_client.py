@@ -0,0 +1,166 @@
+"""
+Reusable client for the Fabric GraphQL API (directly or through APIM)
+"""
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from persisted_queries import PERSISTED_QUERY_NOT_FOUND, is_not_found, persisted_extension
+from query_cost import QueryCostAnalyzer
+from result_cache import ResultCache
+
+
+class GraphQLError(Exception):
+    """Raised when the GraphQL endpoint answers with an `errors` payload"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+        messages = "; ".join(str(e.get("message", e)) for e in errors)
+        super().__init__(f"GraphQL Error: {messages}")
+
+
+class FabricGraphQLClient:
+    """
+    Thin GraphQL client over a pooled `requests.Session`.
+
+    Args:
+        endpoint: GraphQL endpoint URL (Fabric or the APIM `fabric-graphql` API)
+        headers: Extra headers sent with every request (subscription key, bearer token...)
+        session: Optional session to share a connection pool between clients
+        timeout: Request timeout in seconds
+        cost_analyzer: Analyzer used to price queries before they are sent
+        max_cost: Reject queries whose estimated cost exceeds this budget
+        cache: Result cache consulted before sending queries
+        persisted_queries: Send query hashes, falling back to the full text on a miss
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        session: Optional[requests.Session] = None,
+        timeout: float = 30.0,
+        cost_analyzer: Optional[QueryCostAnalyzer] = None,
+        max_cost: Optional[float] = None,
+        cache: Optional[ResultCache] = None,
+        persisted_queries: bool = False,
+    ):
+        self.endpoint = endpoint
+        self.cache = cache
+        self.persisted_queries = persisted_queries
+        self.timeout = timeout
+        self.max_cost = max_cost
+        self.cost_analyzer = cost_analyzer
+        if max_cost is not None and cost_analyzer is None:
+            self.cost_analyzer = QueryCostAnalyzer()
+        self.session = session or requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        if headers:
+            self.session.headers.update(headers)
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "FabricGraphQLClient":
+        """Build a client for the APIM endpoint configured in `.env`"""
+        load_dotenv()
+        endpoint = os.getenv("FABRIC_GRAPHQL_API_URL")
+        subscription_key = os.getenv("FABRIC_GRAPQL_APIM_SUBSCRIPTION_KEY")
+        if not endpoint or not subscription_key:
+            raise ValueError(
+                "FABRIC_GRAPHQL_API_URL and FABRIC_GRAPQL_APIM_SUBSCRIPTION_KEY must be set in environment variables."
+            )
+        return cls(endpoint, headers={"Ocp-Apim-Subscription-Key": subscription_key}, **kwargs)
+
+    def post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a raw GraphQL request body and return the decoded JSON response"""
+        response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def post_raw(self, payload: Dict[str, Any]) -> bytes:
+        """Send a raw GraphQL request body and return the undecoded response body"""
+        response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+    def execute(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute a query and return its `data` member, from the cache when configured.
+
+        Raises:
+            QueryCostError: if the query is estimated over `max_cost` (nothing is sent)
+            GraphQLError: if the response carries GraphQL errors
+            requests.HTTPError: on a non-2xx HTTP status
+        """
+        if self.cache is not None:
+            return self.cache.get_or_fetch(
+                query, variables, lambda: self._send(query, variables, operation_name), operation_name
+            )
+        return self._send(query, variables, operation_name)
+
+    def execute_raw(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+    ) -> bytes:
+        """
+        Execute a query and return the undecoded response body, for decoders that
+        read it directly (see `columnar.py`).
+
+        The cost check and persisted queries apply as in `execute`; the cache does
+        not, and GraphQL errors are left in the body for the caller.
+
+        Raises:
+            QueryCostError: if the query is estimated over `max_cost` (nothing is sent)
+            requests.HTTPError: on a non-2xx HTTP status
+        """
+        return self._request(self.post_raw, _raw_not_found, query, variables, operation_name)
+
+    def _send(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]],
+        operation_name: Optional[str],
+    ) -> Dict[str, Any]:
+        body = self._request(self.post, is_not_found, query, variables, operation_name)
+        if body.get("errors"):
+            raise GraphQLError(body["errors"])
+        return body.get("data") or {}
+
+    def _request(
+        self,
+        post: Callable[[Dict[str, Any]], Any],
+        not_found: Callable[[Any], bool],
+        query: str,
+        variables: Optional[Dict[str, Any]],
+        operation_name: Optional[str],
+    ) -> Any:
+        """Check the cost, then send with `post` (hash first with persisted queries)"""
+        if self.max_cost is not None:
+            self.cost_analyzer.check(query, variables, self.max_cost, operation_name)
+        payload: Dict[str, Any] = {"variables": variables or {}}
+        if operation_name:
+            payload["operationName"] = operation_name
+        if self.persisted_queries:
+            payload["extensions"] = persisted_extension(query)
+            body = post(payload)
+            if not_found(body):
+                body = post({**payload, "query": query})
+        else:
+            body = post({**payload, "query": query})
+        return body
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _raw_not_found(body: bytes) -> bool:
+    return PERSISTED_QUERY_NOT_FOUND.encode() in body and is_not_found(json.loads(body))
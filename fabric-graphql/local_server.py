@@ -0,0 +1,355 @@
+"""
+Local stand-in for the Fabric GraphQL API.
+
+Serves `factory_schema.graphql` over HTTP on top of `factory_iot_data.csv` (or
+synthetic rows) so the client, its benchmarks and its tests can run without
+Fabric or APIM. Only the read path (`factory_iot_datas`) is implemented.
+
+Usage:
+    python local_server.py --port 8081 --latency-ms 20
+"""
+import argparse
+import base64
+import csv
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from graphql import DocumentNode, GraphQLError, GraphQLSyntaxError, build_schema, execute_sync, parse, validate
+
+from persisted_queries import load_manifest, not_found_error, query_hash
+
+HERE = Path(__file__).parent
+SCHEMA_PATH = HERE / "factory_schema.graphql"
+DATA_PATH = HERE / "factory_iot_data.csv"
+
+METRICS = [
+    ("ActivePower_kW", "kW"),
+    ("Current_A", "A"),
+    ("Temperature_C", "C"),
+    ("Occupancy_Status", "boolean"),
+]
+BUILDINGS = ["BLD-PAR-001", "BLD-LYO-002", "BLD-MAR-003"]
+LOCATIONS = ["Floor 1, Office A", "Floor 2, Server Room", "Floor 3, Meeting Room", "Basement, HVAC Unit"]
+
+
+def _to_iso(timestamp: str) -> str:
+    """Format a CSV timestamp the way Fabric returns DateTime values"""
+    parsed = datetime.fromisoformat(timestamp)
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S.") + f"{parsed.microsecond // 1000:03d}Z"
+
+
+def load_rows(path: Path = DATA_PATH) -> List[Dict[str, Any]]:
+    """Load `factory_iot_data.csv` as a list of rows"""
+    with open(path, newline="") as handle:
+        return [
+            {**row, "Timestamp": _to_iso(row["Timestamp"]), "Value": float(row["Value"])}
+            for row in csv.DictReader(handle)
+        ]
+
+
+def synthetic_rows(devices: int, rows_per_device: int = 5, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate telemetry rows for `devices` devices, oldest first"""
+    rng = random.Random(seed)
+    start = datetime(2025, 11, 11, 17, 0, 0)
+    rows = []
+    for i in range(devices * rows_per_device):
+        metric, unit = METRICS[i % len(METRICS)]
+        rows.append({
+            "Timestamp": _to_iso(str(start + timedelta(seconds=i * 5))),
+            "BuildingID": BUILDINGS[(i // devices) % len(BUILDINGS)],
+            "DeviceID": f"DEV-{i % devices:05d}",
+            "Location": LOCATIONS[i % len(LOCATIONS)],
+            "MetricType": metric,
+            "Value": round(rng.uniform(0, 50), 2),
+            "Unit": unit,
+            "Status": "OK" if rng.random() > 0.1 else "Warning",
+        })
+    return rows
+
+
+# ------------------------------
+#    FILTERING / ORDERING
+# ------------------------------
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda v, x: v == x,
+    "neq": lambda v, x: v != x,
+    "gt": lambda v, x: v is not None and v > x,
+    "gte": lambda v, x: v is not None and v >= x,
+    "lt": lambda v, x: v is not None and v < x,
+    "lte": lambda v, x: v is not None and v <= x,
+    "in": lambda v, x: v in x,
+    "contains": lambda v, x: v is not None and x in v,
+    "notContains": lambda v, x: v is None or x not in v,
+    "startsWith": lambda v, x: v is not None and v.startswith(x),
+    "endsWith": lambda v, x: v is not None and v.endswith(x),
+    "isNull": lambda v, x: (v is None or v == "") == x,
+}
+
+
+def matches(row: Dict[str, Any], filter_input: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a `factory_iot_dataFilterInput` against a row"""
+    if not filter_input:
+        return True
+    for key, condition in filter_input.items():
+        if key == "and":
+            if not all(matches(row, sub) for sub in condition or []):
+                return False
+        elif key == "or":
+            if condition and not any(matches(row, sub) for sub in condition):
+                return False
+        else:
+            for op, operand in (condition or {}).items():
+                if operand is not None and not _OPERATORS[op](row.get(key), operand):
+                    return False
+    return True
+
+
+def _apply_order(rows: List[Dict[str, Any]], order_by: Optional[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Stable multi-key sort following the declaration order of `orderBy`"""
+    for field, direction in reversed(list((order_by or {}).items())):
+        rows = sorted(rows, key=lambda r: (r.get(field) is None, r.get(field)), reverse=direction == "DESC")
+    return rows
+
+
+class _Aggregations:
+    """Resolves `factory_iot_dataAggregations` fields for one group"""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+
+    def _values(self, field: str, distinct: bool) -> List[float]:
+        values = [r[field] for r in self.rows if r.get(field) is not None]
+        return list(set(values)) if distinct else values
+
+    def max(self, info, field, having=None, distinct=False):
+        values = self._values(field, distinct)
+        return max(values) if values else None
+
+    def min(self, info, field, having=None, distinct=False):
+        values = self._values(field, distinct)
+        return min(values) if values else None
+
+    def avg(self, info, field, having=None, distinct=False):
+        values = self._values(field, distinct)
+        return sum(values) / len(values) if values else None
+
+    def sum(self, info, field, having=None, distinct=False):
+        return sum(self._values(field, distinct))
+
+    def count(self, info, field, having=None, distinct=False):
+        return len(self._values(field, distinct))
+
+
+class _Connection:
+    """Resolves `factory_iot_dataConnection` for one page of matching rows"""
+
+    def __init__(self, matched: List[Dict[str, Any]], offset: int, first: Optional[int]):
+        end = len(matched) if first is None else offset + first
+        self.matched = matched
+        self.items = matched[offset:end]
+        self.hasNextPage = end < len(matched)
+        self.endCursor = _encode_cursor(end) if self.hasNextPage else None
+
+    def groupBy(self, info, fields=None):
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in self.matched:
+            groups.setdefault(tuple(row.get(f) for f in fields or []), []).append(row)
+        return [
+            {"fields": dict(zip(fields or [], key)), "aggregations": _Aggregations(rows)}
+            for key, rows in groups.items()
+        ]
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.b64encode(f"offset:{offset}".encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode().split(":", 1)[1])
+
+
+class TelemetryStore:
+    """In-memory `factory_iot_data` table exposed as the GraphQL root value"""
+
+    def __init__(self, rows: Optional[Iterable[Dict[str, Any]]] = None):
+        self.rows = list(rows) if rows is not None else load_rows()
+
+    def factory_iot_datas(self, info, first=None, after=None, filter=None, orderBy=None):
+        matched = [r for r in self.rows if matches(r, filter)]
+        return _Connection(_apply_order(matched, orderBy), _decode_cursor(after), first)
+
+
+# ------------------------------
+#    HTTP SERVER
+# ------------------------------
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class LocalGraphQLServer:
+    """
+    Threaded HTTP server answering GraphQL POST requests on any path.
+
+    Args:
+        rows: Telemetry rows to serve (defaults to `factory_iot_data.csv`)
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        latency_ms: Artificial backend latency added to every request
+        persisted_queries: Known `{sha256: document}` persisted queries (see `persisted_queries.py`)
+        document_cache_size: Number of parsed and validated documents to keep (0 disables)
+    """
+
+    def __init__(
+        self,
+        rows: Optional[Iterable[Dict[str, Any]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        persisted_queries: Optional[Dict[str, str]] = None,
+        document_cache_size: int = 256,
+    ):
+        self.schema = build_schema(SCHEMA_PATH.read_text())
+        self.store = TelemetryStore(rows)
+        self.latency_ms = latency_ms
+        self.persisted_queries = dict(persisted_queries or {})
+        self.request_count = 0
+        self.bytes_received = 0
+        self._document = lru_cache(maxsize=document_cache_size)(self._parse_and_validate)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one GraphQL request body and return the response body"""
+        query = payload.get("query")
+        persisted = (payload.get("extensions") or {}).get("persistedQuery")
+        if persisted:
+            digest = persisted.get("sha256Hash")
+            if query is None:
+                query = self.persisted_queries.get(digest)
+                if query is None:
+                    return {"errors": [not_found_error()]}
+            elif query_hash(query) != digest:
+                return {"errors": [{"message": "provided sha does not match query"}]}
+            else:
+                self.persisted_queries[digest] = query
+
+        document, errors = self._document(query or "")
+        if errors:
+            return {"errors": [error.formatted for error in errors]}
+        result = execute_sync(
+            self.schema,
+            document,
+            root_value=self.store,
+            variable_values=payload.get("variables"),
+            operation_name=payload.get("operationName"),
+        )
+        return result.formatted
+
+    def _parse_and_validate(self, query: str) -> Tuple[Optional[DocumentNode], List[GraphQLError]]:
+        try:
+            document = parse(query)
+        except GraphQLSyntaxError as error:
+            return None, [error]
+        errors = validate(self.schema, document)
+        return (None, errors) if errors else (document, [])
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.request_count = 0
+            self.bytes_received = 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                self._start = time.perf_counter()
+                length = int(self.headers.get("Content-Length") or 0)
+                with server._lock:
+                    server.request_count += 1
+                    server.bytes_received += length
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError as error:
+                    self._reply(400, {"errors": [{"message": f"Invalid JSON body: {error}"}]})
+                    return
+                self._reply(200, server.execute(payload))
+
+            def _reply(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Server-Timing", f"app;dur={(time.perf_counter() - self._start) * 1000:.2f}")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "LocalGraphQLServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "LocalGraphQLServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Fabric GraphQL API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Artificial latency per request")
+    parser.add_argument("--devices", type=int, default=0, help="Serve synthetic rows for N devices instead of the CSV")
+    parser.add_argument("--manifest", help="Persisted query manifest to preload")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.devices) if args.devices else None
+    persisted = load_manifest(args.manifest) if args.manifest else None
+    server = LocalGraphQLServer(
+        rows, host=args.host, port=args.port, latency_ms=args.latency_ms, persisted_queries=persisted
+    )
+    print(f"Serving factory_iot_data GraphQL stand-in on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Persisted queries: send a sha256 hash instead of the full GraphQL document.
+
+Follows the automatic persisted query protocol: the request carries
+`extensions.persistedQuery.sha256Hash` and no `query`; a server that does not
+know the hash answers `PersistedQueryNotFound` and the client resends the full
+document once, which registers it. A manifest built ahead of time from the
+known operations (REST facade policies and client modules) pre-registers them
+so even the first request goes out as a hash.
+
+Usage:
+    python persisted_queries.py -o persisted_queries.json   # policies + client modules
+    python persisted_queries.py my_queries.graphql other_module.py
+"""
+import argparse
+import ast
+import hashlib
+import io
+import json
+import re
+import sys
+import tokenize
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from graphql import GraphQLSyntaxError, OperationDefinitionNode, parse
+
+from query_cost import extract_policy_queries
+
+HERE = Path(__file__).parent
+POLICY_DIR = HERE.parent / "fabric-rest-2-graphql"
+
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+PERSISTED_QUERY_VERSION = 1
+
+_OPERATION_START = re.compile(r"^\s*(query|mutation|\{)")
+
+
+@lru_cache(maxsize=1024)
+def query_hash(query: str) -> str:
+    """sha256 hex digest of the exact query text, as used on the wire"""
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def persisted_extension(query: str) -> Dict[str, Any]:
+    """`extensions` member of a hash-only request for `query`"""
+    return {"persistedQuery": {"version": PERSISTED_QUERY_VERSION, "sha256Hash": query_hash(query)}}
+
+
+def not_found_error() -> Dict[str, Any]:
+    return {"message": PERSISTED_QUERY_NOT_FOUND, "extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"}}
+
+
+def is_not_found(body: Dict[str, Any]) -> bool:
+    """Whether a response asks the client to resend the full document"""
+    return any(e.get("message") == PERSISTED_QUERY_NOT_FOUND for e in body.get("errors") or [])
+
+
+def _is_operation(text: str) -> bool:
+    if not _OPERATION_START.match(text):
+        return False
+    try:
+        document = parse(text, no_location=True)
+    except GraphQLSyntaxError:
+        return False
+    return any(isinstance(d, OperationDefinitionNode) for d in document.definitions)
+
+
+def extract_python_queries(source: str) -> List[str]:
+    """
+    Return the string literals of a Python module that are GraphQL operations.
+
+    Adjacent literals (`"query { " "... }"`) count as one string, as in Python.
+    Modules that do not compile, such as half-edited scripts, are scanned
+    token by token instead of through the syntax tree.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        literals = _token_literals(source)
+    else:
+        literals = [n.value for n in ast.walk(tree) if isinstance(n, ast.Constant) and isinstance(n.value, str)]
+    return [literal for literal in literals if _is_operation(literal)]
+
+
+def _token_literals(source: str) -> List[str]:
+    """String literals of possibly broken source, joining adjacent ones"""
+    literals: List[str] = []
+    run: Optional[List[str]] = None
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type in (tokenize.NL, tokenize.COMMENT):
+                continue
+            value = None
+            if token.type == tokenize.STRING:
+                try:
+                    value = ast.literal_eval(token.string)
+                except (ValueError, SyntaxError):
+                    pass
+            if isinstance(value, str):
+                if run is None:
+                    run = []
+                    literals.append("")
+                run.append(value)
+                literals[-1] = "".join(run)
+            else:
+                run = None
+    except tokenize.TokenError:
+        pass
+    return literals
+
+
+def build_manifest(paths: Iterable[Path]) -> Dict[str, str]:
+    """Extract known operations from policy XMLs and Python modules into `{hash: document}`"""
+    manifest: Dict[str, str] = {}
+    for path in paths:
+        text = path.read_text()
+        if path.suffix == ".xml":
+            queries = [q for q in extract_policy_queries(text, strip=False) if _is_operation(q)]
+        elif path.suffix == ".py":
+            queries = extract_python_queries(text)
+        else:
+            queries = [text]
+        for query in queries:
+            manifest[query_hash(query)] = query
+    return dict(sorted(manifest.items()))
+
+
+def default_sources() -> List[Path]:
+    """REST facade policies and the client modules of this directory (tests excluded)"""
+    modules = [p for p in sorted(HERE.glob("*.py")) if not p.name.startswith("test_")]
+    return sorted(POLICY_DIR.glob("*.xml")) + modules
+
+
+def load_manifest(path: Path) -> Dict[str, str]:
+    manifest = json.loads(Path(path).read_text())
+    for digest, query in manifest.items():
+        if query_hash(query) != digest:
+            raise ValueError(f"Manifest entry {digest} does not match its document")
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build a persisted query manifest from the known operations")
+    parser.add_argument(
+        "files", nargs="*", help="APIM policy XML files, Python modules or .graphql documents (default: known sources)"
+    )
+    parser.add_argument("-o", "--output", default="persisted_queries.json")
+    args = parser.parse_args(argv)
+
+    manifest = build_manifest([Path(f) for f in args.files] or default_sources())
+    Path(args.output).write_text(json.dumps(manifest, indent=2) + "\n")
+    print(f"Wrote {len(manifest)} persisted queries to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
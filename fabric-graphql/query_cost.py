@@ -0,0 +1,415 @@
+"""
+Static cost analysis for queries against `factory_schema.graphql`.
+
+Estimates what a query costs before it is sent, following the semantics of
+the schema's `@cost(weight:)` directive:
+
+- a field costs its `@cost` weight, else the `@cost` weight of its type,
+  else 1 for object types and 0 for scalars and enums
+- arguments and input fields add their `@cost` weight when provided
+- list fields multiply their own cost and the cost of their selection by the
+  expected list size, taken from the slicing argument (`first`) of the field
+  that owns the list, or `default_list_size` when the query leaves it unbounded
+
+Parsed and compiled documents are cached, so estimating a known query with new
+variables only walks a small precomputed tree.
+
+Usage:
+    python query_cost.py ../fabric-rest-2-graphql/*.xml --budget 500
+    python query_cost.py -q 'query { factory_iot_datas(first: 10) { items { DeviceID } } }'
+"""
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLSchema,
+    InlineFragmentNode,
+    IntValueNode,
+    ObjectValueNode,
+    OperationDefinitionNode,
+    SchemaMetaFieldDef,
+    TypeMetaFieldDef,
+    VariableNode,
+    build_schema,
+    get_directive_values,
+    get_named_type,
+    get_nullable_type,
+    is_composite_type,
+    is_input_object_type,
+    is_list_type,
+    parse,
+    value_from_ast_untyped,
+)
+
+SCHEMA_PATH = Path(__file__).parent / "factory_schema.graphql"
+
+DEFAULT_LIST_SIZE = 100
+
+
+@dataclass(frozen=True)
+class ListSize:
+    """Where the size of a list comes from (mirrors the `@listSize` directive)"""
+    slicing_argument: str = "first"
+    sized_fields: Tuple[str, ...] = ()
+
+
+# `factory_iot_datas(first:)` sizes the `items` list of the connection it returns.
+DEFAULT_LIST_SIZES: Dict[str, ListSize] = {
+    "Query.factory_iot_datas": ListSize("first", ("items",)),
+}
+
+# Weights for fields the published schema leaves unannotated. `groupBy` makes
+# the backend aggregate every matching row, whatever the page size.
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "factory_iot_dataConnection.groupBy": 10,
+}
+
+
+class QueryCostError(Exception):
+    """Raised when a query's estimated cost exceeds the allowed budget"""
+
+    def __init__(self, cost: float, budget: float):
+        self.cost = cost
+        self.budget = budget
+        super().__init__(f"Estimated query cost {cost:g} exceeds budget {budget:g}")
+
+
+# A list size is a constant, the name of a variable holding it, or _UNBOUNDED
+# (priced at default_list_size); None marks a field that is not a list.
+_Size = Union[int, str, None]
+_UNBOUNDED = -1
+
+
+@dataclass
+class _CostNode:
+    """Precomputed cost of one field; `size` is None for non-list fields"""
+    weight: float
+    size: _Size = None
+    children: List["_CostNode"] = field(default_factory=list)
+
+
+@dataclass
+class _CompiledQuery:
+    nodes: List[_CostNode]
+    variable_defaults: Dict[str, Any]
+
+
+class QueryCostAnalyzer:
+    """
+    Estimate query costs against a schema.
+
+    Args:
+        schema: Schema to analyze against (defaults to `factory_schema.graphql`)
+        default_list_size: Assumed size of lists with no slicing argument
+        list_sizes: `Type.field` -> `ListSize` for fields sizing their lists
+        weights: `Type.field` -> weight for fields without a `@cost` directive
+        cache_size: Number of compiled documents to keep
+    """
+
+    def __init__(
+        self,
+        schema: Optional[GraphQLSchema] = None,
+        default_list_size: int = DEFAULT_LIST_SIZE,
+        list_sizes: Optional[Mapping[str, ListSize]] = None,
+        weights: Optional[Mapping[str, float]] = None,
+        cache_size: int = 256,
+    ):
+        self.schema = schema or build_schema(SCHEMA_PATH.read_text())
+        self.default_list_size = default_list_size
+        self.list_sizes = dict(DEFAULT_LIST_SIZES if list_sizes is None else list_sizes)
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self._cost_directive = self.schema.get_directive("cost")
+        self._compile = lru_cache(maxsize=cache_size)(self._compile_document)
+
+    def estimate(
+        self,
+        query: str,
+        variables: Optional[Mapping[str, Any]] = None,
+        operation_name: Optional[str] = None,
+    ) -> float:
+        """Return the estimated cost of executing `query` with `variables`"""
+        compiled = self._compile(query, operation_name)
+        values = {**compiled.variable_defaults, **(variables or {})}
+        return self._evaluate(compiled.nodes, values)
+
+    def check(
+        self,
+        query: str,
+        variables: Optional[Mapping[str, Any]] = None,
+        budget: float = 1000,
+        operation_name: Optional[str] = None,
+    ) -> float:
+        """Return the estimated cost, raising `QueryCostError` above `budget`"""
+        cost = self.estimate(query, variables, operation_name)
+        if cost > budget:
+            raise QueryCostError(cost, budget)
+        return cost
+
+    def fit_page_size(
+        self,
+        query: str,
+        variables: Optional[Mapping[str, Any]] = None,
+        budget: float = 1000,
+        variable: str = "first",
+        operation_name: Optional[str] = None,
+    ) -> int:
+        """
+        Largest value of the `variable` page size keeping the query within budget.
+
+        Lets callers page through results instead of sending an over-budget query.
+        Returns 0 when even an empty page is over budget.
+        """
+        values = dict(variables or {})
+        low, high = 0, max(int(values.get(variable) or self.default_list_size), 1)
+        while low < high:
+            middle = (low + high + 1) // 2
+            values[variable] = middle
+            if self.estimate(query, values, operation_name) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    # ------------------------------
+    #    EVALUATION
+    # ------------------------------
+
+    def _resolve_size(self, size: _Size, variables: Mapping[str, Any]) -> int:
+        if isinstance(size, str):
+            size = variables.get(size)
+        if size is None or size == _UNBOUNDED:
+            return self.default_list_size
+        return max(int(size), 0)
+
+    def _evaluate(self, nodes: List[_CostNode], variables: Mapping[str, Any]) -> float:
+        total = 0.0
+        for node in nodes:
+            cost = node.weight + self._evaluate(node.children, variables)
+            if node.size is not None:
+                cost *= self._resolve_size(node.size, variables)
+            total += cost
+        return total
+
+    # ------------------------------
+    #    COMPILATION
+    # ------------------------------
+
+    def _compile_document(self, query: str, operation_name: Optional[str]) -> _CompiledQuery:
+        document = parse(query)
+        fragments = {
+            d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)
+        }
+        operations = [d for d in document.definitions if isinstance(d, OperationDefinitionNode)]
+        if operation_name:
+            operations = [o for o in operations if o.name and o.name.value == operation_name]
+        if len(operations) != 1:
+            raise ValueError("Query must contain exactly one operation or name it with operation_name")
+        operation = operations[0]
+
+        root_type = self.schema.get_root_type(operation.operation)
+        defaults = {
+            v.variable.name.value: value_from_ast_untyped(v.default_value)
+            for v in operation.variable_definitions or []
+            if v.default_value is not None
+        }
+        return _CompiledQuery(self._compile_selections(root_type, operation.selection_set, fragments, None), defaults)
+
+    def _compile_selections(self, parent_type, selection_set, fragments, inherited) -> List[_CostNode]:
+        """Compile a selection set; `inherited` is the list size set by the parent field"""
+        nodes: List[_CostNode] = []
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                node = self._compile_field(parent_type, selection, fragments, inherited)
+                if node is not None:
+                    nodes.append(node)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition
+                    else parent_type
+                )
+                nodes.extend(self._compile_selections(fragment_type, selection.selection_set, fragments, inherited))
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = fragments[selection.name.value]
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                nodes.extend(self._compile_selections(fragment_type, fragment.selection_set, fragments, inherited))
+        return nodes
+
+    def _compile_field(self, parent_type, node: FieldNode, fragments, inherited) -> Optional[_CostNode]:
+        name = node.name.value
+        if name == "__typename":
+            return None
+        if name == "__schema":
+            field_def = SchemaMetaFieldDef
+        elif name == "__type":
+            field_def = TypeMetaFieldDef
+        else:
+            field_def = parent_type.fields.get(name)
+            if field_def is None:
+                raise ValueError(f"Cannot query field '{name}' on type '{parent_type.name}'")
+
+        coordinate = f"{parent_type.name}.{name}"
+        named_type = get_named_type(field_def.type)
+        weight = self._field_weight(coordinate, field_def, named_type)
+        weight += self._arguments_weight(field_def, node)
+
+        list_size = self.list_sizes.get(coordinate)
+        slicing: _Size = None
+        if list_size is not None:
+            slicing = _argument_size(node, list_size.slicing_argument)
+
+        size: _Size = None
+        if is_list_type(get_nullable_type(field_def.type)):
+            size = _UNBOUNDED
+            if inherited is not None and name in inherited[0]:
+                size = inherited[1]
+            elif list_size is not None and not list_size.sized_fields:
+                size = slicing
+
+        children: List[_CostNode] = []
+        if node.selection_set is not None:
+            child_inherited = (list_size.sized_fields, slicing) if list_size and list_size.sized_fields else None
+            children = self._compile_selections(named_type, node.selection_set, fragments, child_inherited)
+        return _CostNode(weight, size, children)
+
+    def _cost_weight(self, definition) -> Optional[float]:
+        """Weight from a `@cost` directive on a schema definition, if any"""
+        if self._cost_directive is None or getattr(definition, "ast_node", None) is None:
+            return None
+        values = get_directive_values(self._cost_directive, definition.ast_node)
+        return float(values["weight"]) if values else None
+
+    def _field_weight(self, coordinate: str, field_def, named_type) -> float:
+        weight = self._cost_weight(field_def)
+        if weight is None:
+            weight = self.weights.get(coordinate)
+        if weight is None:
+            weight = self._cost_weight(named_type)
+        if weight is None:
+            weight = 1.0 if is_composite_type(named_type) else 0.0
+        return weight
+
+    def _arguments_weight(self, field_def, node: FieldNode) -> float:
+        weight = 0.0
+        for argument in node.arguments or []:
+            arg_def = field_def.args.get(argument.name.value)
+            if arg_def is None:
+                continue
+            weight += self._cost_weight(arg_def) or 0.0
+            weight += self._input_weight(get_named_type(arg_def.type), argument.value)
+        return weight
+
+    def _input_weight(self, input_type, value) -> float:
+        if not is_input_object_type(input_type) or not isinstance(value, ObjectValueNode):
+            return 0.0
+        weight = 0.0
+        for input_field in value.fields:
+            field_def = input_type.fields.get(input_field.name.value)
+            if field_def is None:
+                continue
+            weight += self._cost_weight(field_def) or 0.0
+            weight += self._input_weight(get_named_type(field_def.type), input_field.value)
+        return weight
+
+
+def _argument_size(node: FieldNode, argument_name: str) -> _Size:
+    for argument in node.arguments or []:
+        if argument.name.value != argument_name:
+            continue
+        if isinstance(argument.value, IntValueNode):
+            return int(argument.value.value)
+        if isinstance(argument.value, VariableNode):
+            return argument.value.name.value
+    return _UNBOUNDED
+
+
+# ------------------------------
+#    CLI
+# ------------------------------
+
+# C# verbatim strings (`@"..."`, quotes doubled) holding GraphQL documents in APIM policies.
+_VERBATIM_STRING = re.compile(r'@"((?:[^"]|"")*)"')
+
+
+def extract_policy_queries(policy_xml: str, strip: bool = True) -> List[str]:
+    """
+    Return the GraphQL documents embedded in an APIM policy's C# expressions.
+
+    With `strip=False` documents are returned byte for byte as the policy sends them.
+    """
+    queries = []
+    for match in _VERBATIM_STRING.finditer(policy_xml):
+        text = match.group(1).replace('""', '"')
+        if re.match(r"^(query|mutation|\{)", text.strip()):
+            queries.append(text.strip() if strip else text)
+    return queries
+
+
+def _describe(error: Exception) -> str:
+    """One-line message for the CLI (GraphQL errors carry a multi-line source excerpt)"""
+    if isinstance(error, GraphQLError):
+        locations = "".join(f" ({loc.line}:{loc.column})" for loc in error.locations or ())
+        return f"{error.message}{locations}"
+    return str(error)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Estimate the cost of GraphQL queries against factory_schema.graphql")
+    parser.add_argument("files", nargs="*", help="APIM policy XML files or .graphql documents")
+    parser.add_argument("-q", "--query", action="append", default=[], help="Inline GraphQL query")
+    parser.add_argument("--variables", default="{}", help="JSON variables applied to every query")
+    parser.add_argument("--budget", type=float, help="Exit with status 1 if any query exceeds this cost")
+    parser.add_argument("--default-list-size", type=int, default=DEFAULT_LIST_SIZE)
+    args = parser.parse_args(argv)
+    try:
+        variables = json.loads(args.variables)
+    except ValueError as error:
+        parser.error(f"--variables is not valid JSON: {error}")
+    if not isinstance(variables, dict):
+        parser.error("--variables must be a JSON object")
+
+    # Unreadable files and invalid queries are reported next to their source;
+    # the exit status is 2 if there were any, else 1 if a query is over budget
+    failed = False
+    sources: List[Tuple[str, str]] = [("<inline>", q) for q in args.query]
+    for path in map(Path, args.files):
+        try:
+            text = path.read_text()
+        except OSError as error:
+            print(f"{'ERROR':>10}  {path.name}: {error}", file=sys.stderr)
+            failed = True
+            continue
+        found = extract_policy_queries(text) if path.suffix == ".xml" else [text]
+        sources.extend((path.name, q) for q in found)
+
+    analyzer = QueryCostAnalyzer(default_list_size=args.default_list_size)
+    over_budget = False
+    for source, query in sources:
+        try:
+            cost = analyzer.estimate(query, variables)
+        except (GraphQLError, ValueError, TypeError) as error:
+            print(f"{'ERROR':>10}  {source}: {_describe(error)}", file=sys.stderr)
+            failed = True
+            continue
+        flag = ""
+        if args.budget is not None and cost > args.budget:
+            over_budget = True
+            flag = "  OVER BUDGET"
+        print(f"{cost:>10g}  {source}{flag}")
+    if failed:
+        return 2
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
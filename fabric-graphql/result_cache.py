@@ -0,0 +1,250 @@
+"""
+Client-side GraphQL result cache.
+
+Results are keyed on a canonical form of the query (whitespace, selection and
+argument order, and redundant `field: field` aliases normalized away) plus the
+variables sorted by name, so textually different copies of the same telemetry
+query share one entry. Fields of input objects keep their declared order, in
+literals and in variables: in `orderBy` it is the sort priority. Entries
+expire after a per-operation TTL and the cache is bounded in both entries and
+approximate bytes, evicting least recently used entries first. With
+`stale_ttl`, an expired entry is still served for that long while a single
+background refresh replaces it.
+
+Results are stored as JSON text and decoded on every hit, so each caller gets
+its own copy and mutating it cannot change the cache.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+from graphql import (
+    ArgumentNode,
+    FieldNode,
+    ListValueNode,
+    ObjectFieldNode,
+    ObjectValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    parse,
+    print_ast,
+)
+
+
+@dataclass(frozen=True)
+class CanonicalQuery:
+    """Normalized form of a query document"""
+    text: str
+    operation_type: str
+    operation_name: Optional[str]
+    root_fields: Tuple[str, ...]
+
+
+def _replace(node, **changes):
+    """Copy an AST node with some attributes changed (nodes may be immutable)"""
+    attributes = {key: getattr(node, key, None) for key in node.keys}
+    attributes.update(changes)
+    return type(node)(**attributes)
+
+
+def _normalize(node):
+    """Return a normalized copy of a parsed AST node"""
+    if isinstance(node, FieldNode):
+        alias = None if node.alias is None or node.alias.value == node.name.value else node.alias
+        arguments = sorted((_normalize(a) for a in node.arguments or ()), key=lambda a: a.name.value)
+        selection_set = _normalize(node.selection_set) if node.selection_set is not None else None
+        return _replace(node, alias=alias, arguments=tuple(arguments), selection_set=selection_set)
+    if isinstance(node, SelectionSetNode):
+        selections = sorted((_normalize(s) for s in node.selections), key=print_ast)
+        return _replace(node, selections=tuple(selections))
+    if isinstance(node, (ArgumentNode, ObjectFieldNode)):
+        return _replace(node, value=_normalize(node.value))
+    if isinstance(node, ObjectValueNode):
+        # Field order is significant (sort priority in `orderBy`), so it is kept
+        return _replace(node, fields=tuple(_normalize(f) for f in node.fields))
+    if isinstance(node, ListValueNode):
+        return _replace(node, values=tuple(_normalize(v) for v in node.values))
+    if getattr(node, "selection_set", None) is not None:
+        return _replace(node, selection_set=_normalize(node.selection_set))
+    return node
+
+
+@lru_cache(maxsize=512)
+def canonicalize(query: str, operation_name: Optional[str] = None) -> CanonicalQuery:
+    """Parse and normalize a query; results are memoized per query text"""
+    document = parse(query, no_location=True)
+    definitions = sorted((_normalize(d) for d in document.definitions), key=print_ast)
+    document = _replace(document, definitions=tuple(definitions))
+
+    operations = [d for d in document.definitions if isinstance(d, OperationDefinitionNode)]
+    if operation_name:
+        operations = [o for o in operations if o.name and o.name.value == operation_name]
+    operation = operations[0] if operations else None
+    return CanonicalQuery(
+        text=print_ast(document),
+        operation_type=operation.operation.value if operation else "query",
+        operation_name=operation.name.value if operation and operation.name else None,
+        root_fields=tuple(
+            s.name.value for s in (operation.selection_set.selections if operation else ()) if isinstance(s, FieldNode)
+        ),
+    )
+
+
+def cache_key(canonical: CanonicalQuery, variables: Optional[Mapping[str, Any]]) -> str:
+    """Stable key for a canonical query and its variables"""
+    # Variables are sorted by name only; input objects inside them keep their order
+    material = "\0".join([
+        canonical.text,
+        canonical.operation_name or "",
+        json.dumps(sorted((variables or {}).items()), separators=(",", ":")),
+    ])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Counters exposed by `ResultCache`"""
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    refreshes: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+
+@dataclass
+class _Entry:
+    text: str
+    size: int
+    expires_at: float
+    stale_until: float
+
+
+class ResultCache:
+    """
+    TTL + LRU cache for GraphQL `data` payloads.
+
+    Args:
+        default_ttl: Seconds an entry stays fresh when no per-operation TTL applies
+        ttls: Per-operation TTLs, keyed by operation name or root field name
+        max_entries: Maximum number of cached results
+        max_bytes: Approximate memory bound (serialized JSON size of the results)
+        stale_ttl: Extra seconds an expired entry may be served while it is refreshed
+        clock: Time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 30.0,
+        ttls: Optional[Mapping[str, float]] = None,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        stale_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl_for(self, canonical: CanonicalQuery) -> float:
+        """TTL of an operation: its name first, then the shortest root field TTL"""
+        if canonical.operation_name in self.ttls:
+            return self.ttls[canonical.operation_name]
+        field_ttls = [self.ttls[f] for f in canonical.root_fields if f in self.ttls]
+        return min(field_ttls) if field_ttls else self.default_ttl
+
+    def get_or_fetch(
+        self,
+        query: str,
+        variables: Optional[Mapping[str, Any]],
+        fetch: Callable[[], Any],
+        operation_name: Optional[str] = None,
+    ) -> Any:
+        """Return the cached result for a query, calling `fetch` on a miss"""
+        canonical = canonicalize(query, operation_name)
+        if canonical.operation_type != "query":
+            return fetch()
+        ttl = self.ttl_for(canonical)
+        if ttl <= 0:
+            return fetch()
+
+        key = cache_key(canonical, variables)
+        now = self.clock()
+        refresh = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                text = entry.text
+            elif entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                self.stats.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    refresh = True
+                text = entry.text
+            else:
+                self.stats.misses += 1
+                entry = None
+
+        if entry is None:
+            value = fetch()
+            self.put(key, value, ttl)
+            return value
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, fetch, ttl), daemon=True).start()
+        return json.loads(text)
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        text = json.dumps(value, separators=(",", ":"))
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        now = self.clock()
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous.size
+            self._entries[key] = _Entry(text, size, now + ttl, now + ttl + self.stale_ttl)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted.size
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def _refresh(self, key: str, fetch: Callable[[], Any], ttl: float) -> None:
+        try:
+            self.put(key, fetch(), ttl)
+            self.stats.refreshes += 1
+        except Exception:
+            # Keep serving the stale entry; the next stale hit retries.
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,96 @@
+"""
+Tests for DeviceLoader request coalescing
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batching import DeviceLoader
+from graphql_client import FabricGraphQLClient, GraphQLError
+from local_server import LocalGraphQLServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    with LocalGraphQLServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    server.reset_stats()
+    return FabricGraphQLClient(server.url)
+
+
+def single_lookup(client, device_id):
+    query = """query ($deviceId: String!) {
+        factory_iot_datas(first: 1, filter: { DeviceID: { eq: $deviceId } }) {
+            items { Timestamp BuildingID DeviceID Location MetricType Value Unit Status }
+        }
+    }"""
+    items = client.execute(query, {"deviceId": device_id})["factory_iot_datas"]["items"]
+    return items[0] if items else None
+
+
+def test_load_many_matches_single_lookups_in_one_round_trip(server, client):
+    device_ids = ["EM-04A-F3", "EM-05B-G1", "HVAC-01C-H2", "UNKNOWN"]
+    expected = [single_lookup(client, d) for d in device_ids]
+    server.reset_stats()
+
+    results = DeviceLoader(client).load_many(device_ids)
+
+    assert results == expected
+    assert results[-1] is None
+    assert server.request_count == 1
+
+
+def test_concurrent_loads_are_coalesced_and_deduplicated(server, client):
+    loader = DeviceLoader(client, window_ms=50)
+    device_ids = ["EM-04A-F3", "LIGHT-02D-I4"] * 10
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(loader.load, device_ids))
+
+    assert [r["DeviceID"] for r in results] == device_ids
+    assert server.request_count == 1
+    assert loader.stats.deduplicated == 18
+
+
+def test_max_batch_size_splits_batches(server, client):
+    loader = DeviceLoader(client, max_batch_size=2)
+    loader.load_many(["EM-04A-F3", "EM-05B-G1", "HVAC-01C-H2"])
+    assert server.request_count == 2
+    assert loader.stats.batches == 2
+
+
+def test_errors_propagate_to_every_caller(client):
+    loader = DeviceLoader(client, fields=("NotAField",))
+    futures = [loader.submit("EM-04A-F3"), loader.submit("EM-05B-G1")]
+    loader.flush()
+    for future in futures:
+        with pytest.raises(GraphQLError):
+            future.result()
+
+
+class GatedClient:
+    """Client whose requests only complete once `parties` of them are in flight together"""
+
+    def __init__(self, client, parties):
+        self.client = client
+        self.gate = threading.Barrier(parties)
+
+    def execute(self, query, variables=None):
+        self.gate.wait(timeout=10)
+        return self.client.execute(query, variables)
+
+
+def test_full_batches_are_sent_without_blocking_submit(server, client):
+    device_ids = ["EM-04A-F3", "EM-05B-G1", "HVAC-01C-H2", "LIGHT-02D-I4"]
+    gated = GatedClient(client, parties=2)
+    loader = DeviceLoader(gated, max_batch_size=2)
+    # If submit() sent a full batch itself, it would wait at the gate for a second
+    # request that could not start, and the futures would fail with BrokenBarrierError
+    futures = [loader.submit(d) for d in device_ids]
+    assert [f.result()["DeviceID"] for f in futures] == device_ids
+    assert server.request_count == 2
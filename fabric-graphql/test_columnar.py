@@ -0,0 +1,87 @@
+"""
+Tests for columnar decoding of telemetry pages
+"""
+import json
+import math
+
+import pytest
+
+from columnar import TIMESTAMP_NULL, ColumnarDecoder, fetch_columns, parse_timestamp
+from graphql_client import FabricGraphQLClient, GraphQLError
+from local_server import LocalGraphQLServer
+from persisted_queries import query_hash
+from query_cost import QueryCostError
+
+QUERY = """query ($first: Int!, $after: String) {
+    factory_iot_datas(first: $first, after: $after) {
+        items { Timestamp DeviceID MetricType Value Status }
+        hasNextPage
+        endCursor
+    }
+}"""
+
+
+def page(items, **connection):
+    return json.dumps({"data": {"factory_iot_datas": {"items": items, **connection}}})
+
+
+def test_pages_from_the_stand_in_match_the_dict_path():
+    with LocalGraphQLServer() as server:
+        client = FabricGraphQLClient(server.url)
+        columns = fetch_columns(client, QUERY, page_size=400)
+        assert server.request_count == 4
+        items = client.execute(QUERY, {"first": 2000})["factory_iot_datas"]["items"]
+    assert len(columns) == len(items) == 1500
+    assert columns["DeviceID"].to_list() == [item["DeviceID"] for item in items]
+    assert columns["Value"].to_list() == [item["Value"] for item in items]
+    assert columns["Timestamp"].values[0] == parse_timestamp(items[0]["Timestamp"])
+    assert sorted(columns["MetricType"].categories) == sorted({item["MetricType"] for item in items})
+
+
+def test_nulls_escapes_and_page_info():
+    items = [
+        {"Timestamp": "2025-11-11T17:36:24.407Z", "DeviceID": "EM-04A-F3", "MetricType": "Power", "Value": 1.5,
+         "Status": "OK"},
+        {"Timestamp": None, "DeviceID": "say \"hi\"", "MetricType": None, "Value": None, "Status": "OK"},
+    ]
+    decoder = ColumnarDecoder(QUERY)
+    info = decoder.decode(page(items, hasNextPage=True, endCursor="b2Zmc2V0OjI="))
+    assert (info.rows, info.has_next_page, info.end_cursor) == (2, True, "b2Zmc2V0OjI=")
+    assert decoder["Timestamp"].values[1] == TIMESTAMP_NULL
+    assert decoder["Timestamp"].to_list()[0].isoformat() == "2025-11-11T17:36:24.407000+00:00"
+    assert decoder["DeviceID"].to_list() == ["EM-04A-F3", 'say "hi"']
+    assert list(decoder["Status"].values) == [0, 0]
+    assert math.isnan(decoder["Value"].values[1])
+
+
+def test_pages_accumulate_and_timestamps_parse_in_any_iso_layout():
+    decoder = ColumnarDecoder(QUERY)
+    reordered = [{"DeviceID": "EM-04A-F3", "Timestamp": "2025-11-11T17:36:24Z", "MetricType": "Power",
+                  "Value": 2, "Status": "OK"}]
+    info = decoder.decode(page(reordered, hasNextPage=False).encode())
+    assert info.rows == 1 and not info.has_next_page
+    assert decoder["Timestamp"].values[0] == parse_timestamp("2025-11-11T17:36:24.000Z")
+    assert parse_timestamp("2025-11-11T17:36:24.4+00:00") == decoder["Timestamp"].values[0] + 400
+    assert decoder.decode(page([])).rows == 0
+    assert len(decoder) == 1
+
+
+def test_pages_go_through_the_cost_check_and_persisted_queries():
+    with LocalGraphQLServer(persisted_queries={query_hash(QUERY): QUERY}) as server:
+        with pytest.raises(QueryCostError):
+            fetch_columns(FabricGraphQLClient(server.url, max_cost=100), QUERY, page_size=5000)
+        assert server.request_count == 0
+        columns = fetch_columns(FabricGraphQLClient(server.url, persisted_queries=True), QUERY, page_size=1000)
+        assert len(columns) == 1500 and server.request_count == 2
+
+
+def test_errors_are_raised():
+    with pytest.raises(GraphQLError):
+        ColumnarDecoder(QUERY).decode(json.dumps({"errors": [{"message": "boom"}], "data": None}))
+
+
+def test_selection_must_be_scalar_items():
+    with pytest.raises(ValueError):
+        ColumnarDecoder("{ factory_iot_datas { hasNextPage } }")
+    with pytest.raises(ValueError):
+        ColumnarDecoder("{ factory_iot_datas { groupBy(fields: [DeviceID]) { fields { DeviceID } } } }")
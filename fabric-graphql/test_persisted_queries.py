@@ -0,0 +1,77 @@
+"""
+Tests for persisted queries (manifest, client fallback, stand-in resolution)
+"""
+import pytest
+
+import bench_cache
+
+from graphql_client import FabricGraphQLClient
+from local_server import LocalGraphQLServer
+from persisted_queries import (
+    build_manifest,
+    default_sources,
+    extract_python_queries,
+    persisted_extension,
+    query_hash,
+)
+
+QUERY = "query { factory_iot_datas(first: 2) { items { DeviceID } } }"
+
+
+@pytest.fixture
+def server():
+    with LocalGraphQLServer() as server:
+        yield server
+
+
+def test_manifest_contains_policy_and_module_operations():
+    manifest = build_manifest(default_sources())
+    details = next(q for q in manifest.values() if "DeviceID: { eq: $deviceId }" in q and "Location" in q)
+    assert manifest[query_hash(details)] == details
+    assert all(query_hash(q) == h for h, q in manifest.items())
+    assert not any(p.name.startswith("test_") for p in default_sources())
+
+
+def test_extract_python_queries_tolerates_broken_scripts():
+    source = 'query = """\nquery { factory_iot_datas { items { DeviceID } } }\n"""\nx = (,\nname = "query is fine"\n'
+    assert extract_python_queries(source) == ["\nquery { factory_iot_datas { items { DeviceID } } }\n"]
+
+
+def test_adjacent_string_literals_are_one_query():
+    source = 'QUERIES = [\n    "query { factory_iot_datas(first: 1) "\n    # comment\n    "{ items { DeviceID } } }",\n]\n'
+    expected = ["query { factory_iot_datas(first: 1) { items { DeviceID } } }"]
+    assert extract_python_queries(source) == expected
+    assert extract_python_queries(source + "x = (,\n") == expected
+
+    manifest = build_manifest(default_sources())
+    assert all(query_hash(q) in manifest for q in bench_cache.DEVICE_LATEST)
+
+
+def test_unknown_hash_falls_back_to_full_text_once(server):
+    client = FabricGraphQLClient(server.url, persisted_queries=True)
+    first = client.execute(QUERY)
+    assert server.request_count == 2
+    server.reset_stats()
+    assert client.execute(QUERY) == first
+    assert server.request_count == 1
+    assert server.execute({"extensions": persisted_extension(QUERY)})["data"] == first
+
+
+def test_manifest_hashes_resolve_on_first_request():
+    with LocalGraphQLServer(persisted_queries={query_hash(QUERY): QUERY}) as server:
+        data = FabricGraphQLClient(server.url, persisted_queries=True).execute(QUERY)
+        assert len(data["factory_iot_datas"]["items"]) == 2
+        assert server.request_count == 1
+
+
+def test_mismatched_hash_is_rejected(server):
+    body = server.execute({"query": QUERY + " ", "extensions": persisted_extension(QUERY)})
+    assert body["errors"][0]["message"] == "provided sha does not match query"
+
+
+def test_documents_are_parsed_and_validated_once(server):
+    server.execute({"query": QUERY})
+    server.execute({"query": QUERY})
+    info = server._document.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert "errors" in server.execute({"query": "{ nope }"})
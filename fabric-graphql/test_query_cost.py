@@ -0,0 +1,104 @@
+"""
+Tests for the static query cost analyzer
+"""
+from pathlib import Path
+
+import pytest
+from graphql import build_schema
+
+from graphql_client import FabricGraphQLClient
+from query_cost import (
+    SCHEMA_PATH,
+    QueryCostAnalyzer,
+    QueryCostError,
+    extract_policy_queries,
+    main,
+)
+
+POLICIES = Path(__file__).parent.parent / "fabric-rest-2-graphql"
+
+PAGE_QUERY = """query ($first: Int = 10) {
+    factory_iot_datas(first: $first) { items { Timestamp DeviceID } endCursor }
+}"""
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return QueryCostAnalyzer()
+
+
+def test_first_multiplies_sized_items(analyzer):
+    # connection (1) + first * items object (1)
+    assert analyzer.estimate("{ factory_iot_datas(first: 10) { items { DeviceID } } }") == 11
+    assert analyzer.estimate(PAGE_QUERY) == 11
+    assert analyzer.estimate(PAGE_QUERY, {"first": 500}) == 501
+
+
+def test_unbounded_lists_use_default_list_size():
+    analyzer = QueryCostAnalyzer(default_list_size=50)
+    assert analyzer.estimate("{ factory_iot_datas { items { DeviceID } } }") == 51
+
+
+def test_group_by_is_weighted(analyzer):
+    query = """{ factory_iot_datas(first: 1) {
+        groupBy(fields: [DeviceID]) { fields { DeviceID } aggregations { avg(field: Value) } }
+    } }"""
+    # connection (1) + 100 groups * (groupBy 10 + fields 1 + aggregations 1)
+    assert analyzer.estimate(query) == 1 + 100 * 12
+
+
+def test_cost_directive_weights_are_applied():
+    sdl = SCHEMA_PATH.read_text().replace(
+        "  MetricType: String\n", '  MetricType: String @cost(weight: "3")\n', 1
+    )
+    analyzer = QueryCostAnalyzer(schema=build_schema(sdl))
+    assert analyzer.estimate("{ factory_iot_datas(first: 2) { items { MetricType } } }") == 1 + 2 * 4
+
+
+def test_fragments_are_expanded(analyzer):
+    query = """query { factory_iot_datas(first: 5) { ...page } }
+    fragment page on factory_iot_dataConnection { items { DeviceID } }"""
+    assert analyzer.estimate(query) == 6
+
+
+def test_check_and_fit_page_size(analyzer):
+    with pytest.raises(QueryCostError):
+        analyzer.check(PAGE_QUERY, {"first": 5000}, budget=1000)
+    assert analyzer.fit_page_size(PAGE_QUERY, {"first": 5000}, budget=1000) == 999
+
+
+def test_client_rejects_over_budget_queries_without_sending():
+    client = FabricGraphQLClient("http://127.0.0.1:9/graphql", max_cost=100)
+    with pytest.raises(QueryCostError):
+        client.execute(PAGE_QUERY, {"first": 1000})
+
+
+def test_policy_queries_are_extracted_and_priced(capsys):
+    details = (POLICIES / "fabric-rest-to-graphql-policy-base-sensors-details.xml").read_text()
+    [query] = extract_policy_queries(details)
+    assert "DeviceID: { eq: $deviceId }" in query
+
+    assert main([str(p) for p in sorted(POLICIES.glob("*.xml"))] + ["--budget", "5"]) == 1
+    output = capsys.readouterr().out
+    assert "OVER BUDGET" in output
+    assert "fabric-rest-to-graphql-policy-base-sensors.xml" in output
+
+
+def test_cli_reports_invalid_queries_per_source(tmp_path, capsys):
+    (tmp_path / "broken.graphql").write_text("query { factory_iot_datas(first: 10 { items { DeviceID } } }")
+    (tmp_path / "unknown.graphql").write_text("query { nope }")
+    (tmp_path / "ok.graphql").write_text("query { factory_iot_datas(first: 10) { items { DeviceID } } }")
+    sized = "query ($n: Int) { factory_iot_datas(first: $n) { items { DeviceID } } }"
+
+    files = [str(tmp_path / name) for name in ("broken.graphql", "unknown.graphql", "ok.graphql", "missing.graphql")]
+    assert main(files + ["-q", sized, "--variables", '{"n": "abc"}']) == 2
+    out, err = capsys.readouterr()
+    assert "ok.graphql" in out
+    assert "broken.graphql: Syntax Error" in err
+    assert "unknown.graphql: Cannot query field 'nope'" in err
+    assert "missing.graphql: " in err
+    assert "<inline>: invalid literal" in err
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["-q", "{ x }", "--variables", "{bad"])
+    assert exit_info.value.code == 2
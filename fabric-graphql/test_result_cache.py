@@ -0,0 +1,141 @@
+"""
+Tests for the client-side result cache
+"""
+import time
+
+import pytest
+
+from graphql_client import FabricGraphQLClient
+from local_server import LocalGraphQLServer
+from result_cache import ResultCache, cache_key, canonicalize
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="module")
+def server():
+    with LocalGraphQLServer() as server:
+        yield server
+
+
+def key(query, variables=None):
+    return cache_key(canonicalize(query), variables)
+
+
+def test_equivalent_queries_share_a_key():
+    reference = key(
+        "query { factory_iot_datas(first: 10, filter: { DeviceID: { eq: $id }, Status: { eq: \"OK\" } }) "
+        "{ items { Timestamp DeviceID } } }",
+        {"id": "EM-04A-F3", "limit": 1},
+    )
+    equivalent = key(
+        """{
+            factory_iot_datas(filter: {DeviceID: {eq: $id}, Status: {eq: "OK"}}, first: 10) {
+                items { DeviceID: DeviceID Timestamp }
+            }
+        }""",
+        {"limit": 1, "id": "EM-04A-F3"},
+    )
+    assert reference == equivalent
+    assert reference != key("{ factory_iot_datas(first: 10) { items { Timestamp DeviceID } } }")
+    assert reference != key("{ factory_iot_datas(first: 10) { items { Timestamp device: DeviceID } } }")
+
+
+def test_input_object_field_order_is_kept():
+    query = "query ($order: factory_iot_dataOrderByInput) {{ factory_iot_datas(orderBy: {}) {{ items {{ Value }} }} }}"
+    by_time = key(query.format("{ Timestamp: DESC, DeviceID: ASC }"))
+    by_device = key(query.format("{ DeviceID: ASC, Timestamp: DESC }"))
+    assert by_time != by_device
+
+    variable = query.format("$order")
+    assert key(variable, {"order": {"Timestamp": "DESC", "DeviceID": "ASC"}, "n": 1}) == key(
+        variable, {"n": 1, "order": {"Timestamp": "DESC", "DeviceID": "ASC"}}
+    )
+    assert key(variable, {"order": {"Timestamp": "DESC", "DeviceID": "ASC"}}) != key(
+        variable, {"order": {"DeviceID": "ASC", "Timestamp": "DESC"}}
+    )
+
+
+def test_callers_get_their_own_copy():
+    cache = ResultCache()
+    query = "{ factory_iot_datas(first: 1) { items { Value } } }"
+    first = cache.get_or_fetch(query, None, lambda: {"items": [{"Value": 1.5}]})
+    first["items"].clear()
+    second = cache.get_or_fetch(query, None, lambda: {"items": []})
+    assert second == {"items": [{"Value": 1.5}]}
+    second["items"][0]["Value"] = 0
+    assert cache.get_or_fetch(query, None, lambda: {"items": []}) == {"items": [{"Value": 1.5}]}
+
+
+def test_ttl_per_operation_and_expiry():
+    clock = FakeClock()
+    cache = ResultCache(default_ttl=10, ttls={"Latest": 1}, clock=clock)
+    calls = []
+
+    def fetch():
+        calls.append(clock.now)
+        return {"n": len(calls)}
+
+    latest = "query Latest { factory_iot_datas(first: 1) { items { Value } } }"
+    page = "query { factory_iot_datas(first: 10) { items { Value } } }"
+    assert cache.get_or_fetch(latest, None, fetch) == {"n": 1}
+    assert cache.get_or_fetch(page, None, fetch) == {"n": 2}
+    clock.now = 2
+    assert cache.get_or_fetch(latest, None, fetch) == {"n": 3}
+    assert cache.get_or_fetch(page, None, fetch) == {"n": 2}
+    assert (cache.stats.hits, cache.stats.misses) == (1, 3)
+
+
+def test_lru_eviction_by_bytes():
+    cache = ResultCache(max_bytes=60)
+    for device in ("A", "B", "C"):
+        cache.get_or_fetch(
+            "query ($d: String) { factory_iot_datas(filter: { DeviceID: { eq: $d } }) { items { Value } } }",
+            {"d": device},
+            lambda: {"payload": "x" * 10},
+        )
+    assert len(cache) == 2
+    assert cache.size_bytes <= 60
+    assert cache.stats.evictions == 1
+
+
+def test_stale_while_revalidate_serves_stale_and_refreshes():
+    clock = FakeClock()
+    cache = ResultCache(default_ttl=1, stale_ttl=5, clock=clock)
+    values = iter([{"v": 1}, {"v": 2}])
+    query = "{ factory_iot_datas(first: 1) { items { Value } } }"
+
+    assert cache.get_or_fetch(query, None, lambda: next(values)) == {"v": 1}
+    clock.now = 2
+    assert cache.get_or_fetch(query, None, lambda: next(values)) == {"v": 1}
+    for _ in range(100):
+        if cache.stats.refreshes:
+            break
+        time.sleep(0.01)
+    assert cache.get_or_fetch(query, None, lambda: next(values)) == {"v": 2}
+    assert cache.stats.stale_hits == 1
+
+
+def test_mutations_are_not_cached():
+    cache = ResultCache()
+    calls = []
+    for _ in range(2):
+        cache.get_or_fetch("mutation { noop }", None, lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_client_serves_repeated_queries_from_cache(server):
+    server.reset_stats()
+    cache = ResultCache()
+    client = FabricGraphQLClient(server.url, cache=cache)
+    first = client.execute("{ factory_iot_datas(first: 3) { items { DeviceID Timestamp } } }")
+    second = client.execute("{ factory_iot_datas(first: 3) { items { Timestamp DeviceID } } }")
+    assert first == second
+    assert server.request_count == 1
+    assert cache.stats.hits == 1
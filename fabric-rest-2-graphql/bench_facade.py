@@ -0,0 +1,140 @@
+"""
+Benchmark the Python facade against the policy-only behaviour.
+
+Starts the facade twice on local ports against the same upstream GraphQL
+endpoint: once like the APIM policies (every REST call becomes an upstream
+call) and once with route caching, single-flight and the latest-value index
+enabled. Both are hit with the same concurrent `/sensors` +
+`/sensors/{deviceid}` workload. With `--apim-url`, the deployed APIM facade
+is measured as well.
+
+Usage:
+    python ../fabric-graphql/local_server.py --port 8081 --latency-ms 20 &
+    python bench_facade.py --upstream http://127.0.0.1:8081/graphql --requests 1000 --concurrency 50
+"""
+import argparse
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FacadeServer:
+    """Run a facade instance with uvicorn in a separate process"""
+
+    def __init__(self, upstream_url: str, cached: bool):
+        self.port = free_port()
+        ttl = "10" if cached else "0"
+        self.env = {
+            **os.environ,
+            "FABRIC_GRAPHQL_API_URL": upstream_url,
+            "SENSORS_CACHE_TTL": ttl,
+            "SENSOR_DETAILS_CACHE_TTL": ttl,
+            "UPSTREAM_SINGLE_FLIGHT": str(cached).lower(),
+            "SENSORS_FROM_INDEX": str(cached).lower(),
+            "TELEMETRY_SYNC_INTERVAL": "60" if cached else "0",
+            # The stand-in's telemetry is older than the default lookback
+            "TELEMETRY_LOOKBACK_DAYS": "0",
+        }
+        self.process = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=Path(__file__).parent,
+            env=self.env,
+        )
+        for _ in range(500):
+            try:
+                httpx.get(f"{self.url}/health")
+                return self
+            except httpx.TransportError:
+                time.sleep(0.02)
+        raise RuntimeError("Facade did not start")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+
+def run_workload(base_url, paths, concurrency, headers=None):
+    """Replay `paths` from `concurrency` threads, each with its own keep-alive connection"""
+    local = threading.local()
+
+    def get(path):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = httpx.Client(base_url=base_url, headers=headers, timeout=60)
+        start = time.perf_counter()
+        status_code = client.get(path).status_code
+        return (time.perf_counter() - start) * 1000, status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(get, paths))
+    elapsed = time.perf_counter() - start
+
+    health = httpx.get(f"{base_url}/health", headers=headers)
+    upstream = health.json().get("upstream") if health.status_code == 200 else None
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "errors": sum(status_code != 200 for _, status_code in results),
+        "upstream_calls": upstream["upstream_calls"] if upstream else None,
+    }
+
+
+def build_paths(device_ids, count, seed=3):
+    rng = random.Random(seed)
+    return ["/sensors" if rng.random() < 0.2 else f"/sensors/{rng.choice(device_ids)}" for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstream", default=os.getenv("FABRIC_GRAPHQL_API_URL"), help="Upstream GraphQL endpoint")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--apim-url", default=os.getenv("FABRIC_REST_API_URL"), help="Deployed APIM REST facade")
+    args = parser.parse_args()
+    if not args.upstream:
+        parser.error("--upstream or FABRIC_GRAPHQL_API_URL is required")
+
+    results = {}
+    for name, cached in (("policy-like", False), ("facade", True)):
+        with FacadeServer(args.upstream, cached) as facade:
+            sensors = httpx.get(f"{facade.url}/sensors").json()["sensors"]
+            paths = build_paths(sorted({s["DeviceID"] for s in sensors}), args.requests)
+            results[name] = run_workload(facade.url, paths, args.concurrency)
+    if args.apim_url:
+        headers = {"Ocp-Apim-Subscription-Key": os.getenv("FABRIC_REST_APIM_SUBSCRIPTION_KEY", "")}
+        results["apim"] = run_workload(args.apim_url.rstrip("/"), paths, args.concurrency, headers)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, upstream {args.upstream}")
+    print(f"{'path':<13}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}{'upstream calls':>16}")
+    for name, r in results.items():
+        calls = "-" if r["upstream_calls"] is None else r["upstream_calls"]
+        print(f"{name:<13}{r['throughput']:>10.1f}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['errors']:>8}{calls:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Latest-value index of `factory_iot_data` telemetry.
+
+Keeps the newest reading per (DeviceID, MetricType), the newest reading per
+device and the newest few readings overall, so "current state" lookups are
+dictionary reads instead of a filtered `first: 1` scan upstream (which does
+not guarantee the newest row).
+"""
+import heapq
+from itertools import count as counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from rollups import to_epoch
+
+Reading = Dict[str, Any]
+
+
+class LatestIndex:
+    """
+    Newest reading per device and metric, fed incrementally with `ingest(rows)`.
+
+    Args:
+        recent: Number of newest readings (of any device) kept for `recent()`
+    """
+
+    def __init__(self, recent: int = 10):
+        self.recent_size = recent
+        self._by_metric: Dict[str, Dict[str, Tuple[float, Reading]]] = {}
+        self._newest: Dict[str, Tuple[float, Reading]] = {}
+        # Min-heap of the newest readings; the counter breaks timestamp ties by arrival
+        self._recent: List[Tuple[float, int, Reading]] = []
+        self._arrival = counter()
+
+    def __len__(self) -> int:
+        return len(self._newest)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._newest
+
+    def ingest(self, rows: Iterable[Reading]) -> int:
+        """Index rows in any order; a reading only replaces an older one (ties go to the later row)"""
+        count = 0
+        for row in rows:
+            device_id, timestamp = row.get("DeviceID"), row.get("Timestamp")
+            if device_id is None or timestamp is None:
+                continue
+            entry = (to_epoch(timestamp), row)
+            metrics = self._by_metric.setdefault(device_id, {})
+            metric = row.get("MetricType") or ""
+            if metric not in metrics or entry[0] >= metrics[metric][0]:
+                metrics[metric] = entry
+            if device_id not in self._newest or entry[0] >= self._newest[device_id][0]:
+                self._newest[device_id] = entry
+            if self.recent_size > 0:
+                item = (entry[0], next(self._arrival), row)
+                if len(self._recent) < self.recent_size:
+                    heapq.heappush(self._recent, item)
+                elif item[0] >= self._recent[0][0]:
+                    heapq.heapreplace(self._recent, item)
+            count += 1
+        return count
+
+    def device(self, device_id: str) -> List[Reading]:
+        """Newest reading of each metric of a device, newest first"""
+        entries = self._by_metric.get(device_id, {}).values()
+        return [row for _, row in sorted(entries, key=lambda e: e[0], reverse=True)]
+
+    def latest(self, device_id: str) -> Reading:
+        """Newest reading of a device, whatever its metric"""
+        return self._newest[device_id][1]
+
+    def recent(self) -> List[Reading]:
+        """Newest `recent` readings of any device, newest first"""
+        return [row for _, _, row in sorted(self._recent, key=lambda e: (e[0], e[1]), reverse=True)]
+
+    def all(self) -> List[Reading]:
+        """Newest reading of every device, newest first"""
+        return [row for _, row in sorted(self._newest.values(), key=lambda e: e[0], reverse=True)]
@@ -0,0 +1,317 @@
+"""Fabric REST to GraphQL facade - Python implementation of the APIM sensor policies"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+import uvicorn
+
+from latest_index import LatestIndex
+from rollups import DAY, HOUR, MINUTE, RollupEngine, parse_step, to_epoch, to_iso
+from telemetry_feed import TelemetryFeed
+from upstream import GraphQLUpstream, UpstreamResult, gateway_error
+
+
+logger = logging.getLogger("fabric-rest-to-graphql")
+
+# Same documents as fabric-rest-to-graphql-policy-base-sensors.xml and
+# fabric-rest-to-graphql-policy-base-sensors-details.xml, plus an explicit
+# newest-first order (without it `first: N` returns arbitrary rows).
+SENSORS_QUERY = """query {
+    factory_iot_datas(first: 10, orderBy: { Timestamp: DESC }) {
+        items {
+            Timestamp
+            BuildingID
+            DeviceID
+        }
+    }
+}"""
+
+SENSOR_DETAILS_QUERY = """query ($deviceId: String!) {
+    factory_iot_datas(
+        first: 1
+        filter: { DeviceID: { eq: $deviceId } }
+        orderBy: { Timestamp: DESC }
+    ) {
+        items {
+            Timestamp
+            BuildingID
+            DeviceID
+            Location
+            MetricType
+            Value
+            Unit
+            Status
+        }
+    }
+}"""
+
+# Selection of SENSORS_QUERY; its page size is the size of the latest-value index's `recent()` list
+SENSORS_FIELDS = ("Timestamp", "BuildingID", "DeviceID")
+SENSORS_PAGE_SIZE = 10
+
+# Request headers forwarded on the `/graphql` pass-through
+PASSTHROUGH_HEADERS = ("content-type", "accept", "authorization")
+
+
+def upstream_from_env() -> GraphQLUpstream:
+    """Build the upstream client from `FABRIC_GRAPHQL_API_URL` / `FABRIC_GRAPQL_APIM_SUBSCRIPTION_KEY`"""
+    endpoint = os.getenv("FABRIC_GRAPHQL_API_URL")
+    if not endpoint:
+        raise ValueError("FABRIC_GRAPHQL_API_URL must be set in environment variables.")
+    headers = {}
+    subscription_key = os.getenv("FABRIC_GRAPQL_APIM_SUBSCRIPTION_KEY")
+    if subscription_key:
+        headers["Ocp-Apim-Subscription-Key"] = subscription_key
+    return GraphQLUpstream(
+        endpoint,
+        headers=headers,
+        max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+        single_flight=os.getenv("UPSTREAM_SINGLE_FLIGHT", "true").lower() == "true",
+    )
+
+
+def fabric_error(result: UpstreamResult, status_code: Optional[int] = None) -> JSONResponse:
+    """`Fabric API Error` answer of the base policy, with the upstream status and body"""
+    return JSONResponse(
+        status_code=status_code or result.status_code,
+        content={
+            "error": "Fabric API Error",
+            "statusCode": result.status_code,
+            "statusReason": result.reason,
+            "body": result.body.decode(errors="replace"),
+        },
+    )
+
+
+def sensors_response(result: UpstreamResult) -> Response:
+    """Shape an upstream answer like the outbound section of the base policy"""
+    if not result.ok:
+        return fabric_error(result)
+    try:
+        body = result.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        # A 200 that is not a GraphQL response (an HTML error page, a truncated body...)
+        return fabric_error(result, status_code=502)
+    data = body.get("data") or {}
+    if data.get("factory_iot_datas") is not None:
+        return JSONResponse(content={"sensors": data["factory_iot_datas"]["items"]})
+    if body.get("errors") is not None:
+        return JSONResponse(content={"error": "GraphQL Error", "details": body["errors"]})
+    return JSONResponse(content={"error": "Unexpected response format", "response": body})
+
+
+def create_app(
+    upstream: Optional[GraphQLUpstream] = None,
+    sensors_ttl: Optional[float] = None,
+    sensor_details_ttl: Optional[float] = None,
+    sync_interval: Optional[float] = None,
+    sensors_from_index: Optional[bool] = None,
+    lookback_days: Optional[float] = None,
+    minute_retention_days: Optional[float] = None,
+    hour_retention_days: Optional[float] = None,
+) -> FastAPI:
+    """
+    Create the facade application.
+
+    Args:
+        upstream: Upstream client (defaults to one built from environment variables at startup)
+        sensors_ttl: Cache TTL in seconds for `GET /sensors` (env `SENSORS_CACHE_TTL`, default 10)
+        sensor_details_ttl: Cache TTL in seconds for `GET /sensors/{deviceid}` (env `SENSOR_DETAILS_CACHE_TTL`, default 5)
+        sync_interval: Seconds between telemetry syncs feeding the rollups and the latest-value index
+            (env `TELEMETRY_SYNC_INTERVAL`, default 0: no background sync)
+        sensors_from_index: Serve `/sensors` and `/sensors/{deviceid}` from the latest-value index once the
+            telemetry is synced (env `SENSORS_FROM_INDEX`, default true)
+        lookback_days: Days of telemetry loaded by the first sync (env `TELEMETRY_LOOKBACK_DAYS`, default 7);
+            0 loads the whole table
+        minute_retention_days: Days of 1-minute buckets kept (env `ROLLUP_MINUTE_RETENTION_DAYS`, default 2)
+        hour_retention_days: Days of 1-hour buckets kept (env `ROLLUP_HOUR_RETENTION_DAYS`, default 90)
+    """
+    if sensors_ttl is None:
+        sensors_ttl = float(os.getenv("SENSORS_CACHE_TTL", "10"))
+    if sensor_details_ttl is None:
+        sensor_details_ttl = float(os.getenv("SENSOR_DETAILS_CACHE_TTL", "5"))
+    if sync_interval is None:
+        sync_interval = float(os.getenv("TELEMETRY_SYNC_INTERVAL", "0"))
+    if sensors_from_index is None:
+        sensors_from_index = os.getenv("SENSORS_FROM_INDEX", "true").lower() == "true"
+    if lookback_days is None:
+        lookback_days = float(os.getenv("TELEMETRY_LOOKBACK_DAYS", "7"))
+    if minute_retention_days is None:
+        minute_retention_days = float(os.getenv("ROLLUP_MINUTE_RETENTION_DAYS", "2"))
+    if hour_retention_days is None:
+        hour_retention_days = float(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", "90"))
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Configure logging, open the pooled upstream client and start the telemetry sync"""
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.INFO)
+        # httpx logs every upstream call at INFO, which costs more than a cache hit
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        app.state.upstream = upstream or upstream_from_env()
+        app.state.rollups = RollupEngine(retention={MINUTE: minute_retention_days * DAY, HOUR: hour_retention_days * DAY})
+        app.state.latest = LatestIndex(recent=SENSORS_PAGE_SIZE)
+        app.state.feed = TelemetryFeed(
+            app.state.upstream, [app.state.rollups, app.state.latest], lookback=lookback_days * DAY or None
+        )
+        sync_task = asyncio.create_task(app.state.feed.run(sync_interval)) if sync_interval > 0 else None
+        yield
+        if sync_task is not None:
+            sync_task.cancel()
+        await app.state.upstream.aclose()
+
+    app = FastAPI(
+        title="Rest to GraphQL Fabric API",
+        description="REST facade over the Fabric GraphQL API for factory sensors",
+        version="1.0",
+        lifespan=lifespan,
+    )
+
+    @app.middleware("http")
+    async def server_timing(request: Request, call_next):
+        """Report the time spent in the facade as `Server-Timing: app;dur=<ms>` (forwarded by APIM)"""
+        start = time.perf_counter()
+        response = await call_next(request)
+        response.headers["Server-Timing"] = f"app;dur={(time.perf_counter() - start) * 1000:.2f}"
+        return response
+
+    @app.get("/health")
+    async def health_check(request: Request):
+        """Health check endpoint, with upstream cache, single-flight and telemetry sync counters"""
+        feed: TelemetryFeed = request.app.state.feed
+        return {
+            "status": "healthy",
+            "timestamp": datetime.utcnow().isoformat(),
+            "upstream": vars(request.app.state.upstream.stats),
+            "telemetry": {
+                "synced": feed.synced,
+                "rows": feed.rows_read,
+                "watermark": feed.watermark,
+                "devices": len(request.app.state.latest),
+                "last_sync": datetime.utcfromtimestamp(feed.last_sync).isoformat() if feed.last_sync else None,
+                "last_error": feed.last_error,
+            },
+        }
+
+    def index_is_current(feed: TelemetryFeed) -> bool:
+        """Whether the latest-value index can answer: synced, and not stale when the sync keeps failing"""
+        if not sensors_from_index or not feed.synced:
+            return False
+        return sync_interval <= 0 or feed.sync_age() <= 2 * sync_interval
+
+    @app.get("/sensors")
+    async def list_sensors(request: Request):
+        """List the 10 newest sensor readings, newest first"""
+        # Before the first telemetry sync, or once it is stale, ask upstream like the policy does
+        if index_is_current(request.app.state.feed):
+            readings = request.app.state.latest.recent()
+            # Fewer rows than a page only means "the whole table" when the whole table was loaded
+            if len(readings) >= SENSORS_PAGE_SIZE or lookback_days <= 0:
+                return {"sensors": [{field: row.get(field) for field in SENSORS_FIELDS} for row in readings]}
+        result = await request.app.state.upstream.execute(SENSORS_QUERY, ttl=sensors_ttl)
+        return sensors_response(result)
+
+    @app.get("/sensors/{deviceid}")
+    async def get_sensor(deviceid: str, request: Request):
+        """
+        Get the details of a sensor: its newest reading
+
+        Args:
+            deviceid: The device identifier
+        """
+        latest: LatestIndex = request.app.state.latest
+        # A device missing from the index may only have readings older than the lookback window
+        if index_is_current(request.app.state.feed) and deviceid in latest:
+            return {"sensors": [latest.latest(deviceid)]}
+        result = await request.app.state.upstream.execute(
+            SENSOR_DETAILS_QUERY, {"deviceId": deviceid}, ttl=sensor_details_ttl
+        )
+        return sensors_response(result)
+
+    @app.get("/sensors/{deviceid}/series")
+    async def get_sensor_series(
+        deviceid: str,
+        request: Request,
+        start: Optional[datetime] = Query(None, alias="from"),
+        end: Optional[datetime] = Query(None, alias="to"),
+        step: str = "1h",
+        metric: Optional[str] = None,
+    ):
+        """
+        Get min/max/avg/sum/count/last aggregates of a sensor per time bucket
+
+        Args:
+            deviceid: The device identifier
+            start: Start of the range, a whole minute (`from`, defaults to one day before `to`)
+            end: End of the range, exclusive, a whole minute (`to`, defaults to the minute after the newest
+                reading); points cut by either bound only aggregate the readings inside the range
+            step: Bucket size, a multiple of one minute (`5m`, `1h`, `1d` or seconds)
+            metric: Only return this MetricType
+        """
+        feed: TelemetryFeed = request.app.state.feed
+        rollups: RollupEngine = request.app.state.rollups
+        if not feed.synced:
+            if sync_interval <= 0:
+                raise HTTPException(status_code=503, detail="Telemetry sync is disabled (TELEMETRY_SYNC_INTERVAL)")
+            raise HTTPException(status_code=503, detail="Telemetry rollups are not loaded yet")
+        try:
+            step_seconds = parse_step(step)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if end is None and feed.watermark is None:
+            # Synced, but no reading was loaded (none in the lookback window): no device has a series
+            raise HTTPException(status_code=404, detail=f"Sensor {deviceid} not found")
+        end_epoch = to_epoch(end) if end else (to_epoch(feed.watermark) // MINUTE + 1) * MINUTE
+        start_epoch = to_epoch(start) if start else end_epoch - DAY
+        if start_epoch >= end_epoch:
+            raise HTTPException(status_code=400, detail="from must be before to")
+        try:
+            series = rollups.series(deviceid, start_epoch, end_epoch, step_seconds, metric)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not series and deviceid not in rollups:
+            raise HTTPException(status_code=404, detail=f"Sensor {deviceid} not found")
+        return {
+            "deviceId": deviceid,
+            "from": to_iso(start_epoch),
+            "to": to_iso(end_epoch),
+            "step": step_seconds,
+            "resolution": rollups.resolution_for(step_seconds),
+            "series": series,
+        }
+
+    @app.post("/graphql")
+    async def graphql_passthrough(request: Request):
+        """Stream a GraphQL request to the upstream endpoint and its response back, unbuffered"""
+        upstream: GraphQLUpstream = request.app.state.upstream
+        headers = {k: v for k, v in request.headers.items() if k.lower() in PASSTHROUGH_HEADERS}
+        try:
+            response = await upstream.stream(await request.body(), headers)
+        except httpx.HTTPError as error:
+            upstream.stats.upstream_errors += 1
+            return fabric_error(gateway_error(error))
+        return StreamingResponse(
+            response.aiter_bytes(),
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type", "application/json"),
+            background=BackgroundTask(response.aclose),
+        )
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,267 @@
+"""
+Incremental time-bucketed rollups of `factory_iot_data` telemetry.
+
+Keeps min/max/sum/count/last aggregates per (BuildingID, DeviceID, MetricType)
+in 1-minute, 1-hour and 1-day buckets. Rows update every resolution as they
+are ingested, and range queries are answered from the coarsest resolution
+that divides the requested step, instead of scanning raw rows. Where the
+range does not start or end on a bucket boundary, the edges are read from
+finer buckets, so no reading outside the range is counted.
+
+Fine resolutions can be given a retention: buckets older than that, relative
+to the newest reading ingested, are dropped, and ranges needing them are
+refused instead of being answered from partial data.
+"""
+import math
+import re
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+RESOLUTIONS = (DAY, HOUR, MINUTE)
+
+_STEP = re.compile(r"^(\d+)([smhd]?)$")
+_UNITS = {"": 1, "s": 1, "m": MINUTE, "h": HOUR, "d": DAY}
+
+SeriesKey = Tuple[str, str, str]
+
+
+def parse_step(step: str) -> int:
+    """Parse a step such as `300`, `5m`, `1h` or `1d` into seconds"""
+    match = _STEP.match(step.strip())
+    if not match:
+        raise ValueError(f"Invalid step '{step}'")
+    seconds = int(match.group(1)) * _UNITS[match.group(2)]
+    if seconds <= 0 or seconds % MINUTE:
+        raise ValueError("step must be a positive multiple of 1 minute")
+    return seconds
+
+
+def to_epoch(timestamp: Any) -> float:
+    """Seconds since the epoch for a DateTime value (`2025-11-11T17:36:24.407Z`) or datetime"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+@dataclass
+class Aggregate:
+    """Running aggregate of the readings of one bucket"""
+    min: float
+    max: float
+    sum: float
+    count: int
+    last: float
+    last_at: float
+
+    @classmethod
+    def of(cls, value: float, at: float) -> "Aggregate":
+        return cls(value, value, value, 1, value, at)
+
+    def add(self, value: float, at: float) -> None:
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        self.count += 1
+        if at >= self.last_at:
+            self.last, self.last_at = value, at
+
+    def merge(self, other: "Aggregate") -> None:
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.count += other.count
+        if other.last_at >= self.last_at:
+            self.last, self.last_at = other.last, other.last_at
+
+    def copy(self) -> "Aggregate":
+        return Aggregate(self.min, self.max, self.sum, self.count, self.last, self.last_at)
+
+
+class _Buckets:
+    """Buckets of one series at one resolution, with sorted starts for range scans"""
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.aggregates: Dict[int, Aggregate] = {}
+
+    def add(self, start: int, value: float, at: float) -> None:
+        aggregate = self.aggregates.get(start)
+        if aggregate is None:
+            self.aggregates[start] = Aggregate.of(value, at)
+            if not self.starts or start > self.starts[-1]:
+                self.starts.append(start)
+            else:
+                insort(self.starts, start)
+        else:
+            aggregate.add(value, at)
+
+    def prune(self, before: int) -> None:
+        """Drop buckets starting before `before`"""
+        index = bisect_left(self.starts, before)
+        for start in self.starts[:index]:
+            del self.aggregates[start]
+        del self.starts[:index]
+
+    def range(self, start: int, end: int) -> Iterable[Tuple[int, Aggregate]]:
+        for index in range(bisect_left(self.starts, start), bisect_left(self.starts, end)):
+            bucket = self.starts[index]
+            yield bucket, self.aggregates[bucket]
+
+
+class RollupEngine:
+    """
+    Time-bucketed aggregates of telemetry rows.
+
+    Args:
+        resolutions: Bucket sizes in seconds, each dividing the next larger one
+        retention: Seconds of buckets kept per resolution, behind the newest reading
+            (resolutions not listed are kept forever)
+    """
+
+    def __init__(self, resolutions: Iterable[int] = RESOLUTIONS, retention: Optional[Dict[int, float]] = None):
+        self.resolutions = tuple(sorted(resolutions, reverse=True))
+        self.retention = {r: seconds for r, seconds in (retention or {}).items() if seconds > 0}
+        self.rows_ingested = 0
+        self.newest: Optional[float] = None
+        # Oldest bucket start still kept per resolution
+        self.horizon: Dict[int, float] = {r: -math.inf for r in self.resolutions}
+        self._series: Dict[SeriesKey, Dict[int, _Buckets]] = {}
+        self._by_device: Dict[str, List[SeriesKey]] = {}
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Add rows to every resolution; rows may arrive in any order"""
+        count = 0
+        for row in rows:
+            value = row.get("Value")
+            if value is None or not row.get("Timestamp"):
+                continue
+            key = (row.get("BuildingID") or "", row["DeviceID"], row.get("MetricType") or "")
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {r: _Buckets() for r in self.resolutions}
+                self._by_device.setdefault(key[1], []).append(key)
+            at = to_epoch(row["Timestamp"])
+            for resolution, buckets in series.items():
+                start = int(at // resolution) * resolution
+                if start >= self.horizon[resolution]:
+                    buckets.add(start, float(value), at)
+            if self.newest is None or at > self.newest:
+                self.newest = at
+            count += 1
+        self.rows_ingested += count
+        if count and self.retention:
+            self._prune()
+        return count
+
+    def _prune(self) -> None:
+        for resolution, seconds in self.retention.items():
+            horizon = (self.newest - seconds) // resolution * resolution
+            if horizon <= self.horizon[resolution]:
+                continue
+            self.horizon[resolution] = horizon
+            for series in self._series.values():
+                series[resolution].prune(int(horizon))
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._by_device
+
+    def devices(self) -> List[str]:
+        return sorted(self._by_device)
+
+    def resolution_for(self, step: int) -> int:
+        """Coarsest resolution whose buckets tile a step exactly"""
+        for resolution in self.resolutions:
+            if step % resolution == 0:
+                return resolution
+        raise ValueError(f"step {step}s is not a multiple of any resolution {self.resolutions}")
+
+    def series(
+        self,
+        device_id: str,
+        start: float,
+        end: float,
+        step: int,
+        metric_type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregates of a device per `step` over `[start, end)`, one series per
+        (BuildingID, MetricType).
+
+        Points are aligned on multiples of `step`; when `start` or `end` falls
+        inside a step, the first or last point only covers the part inside the
+        range (its `start` is then `start`). Both bounds must be multiples of
+        the finest resolution.
+        """
+        finest = self.resolutions[-1]
+        if start % finest or end % finest:
+            raise ValueError(f"from and to must be multiples of {finest}s")
+        start, end = int(start), int(end)
+        # Buckets of the resolution tiling `step`, or finer ones, never straddle two points
+        levels = [r for r in self.resolutions if self.resolution_for(step) % r == 0]
+        result = []
+        for key in sorted(self._by_device.get(device_id, [])):
+            building_id, _, metric = key
+            if metric_type is not None and metric != metric_type:
+                continue
+            merged: Dict[int, Aggregate] = {}
+            for bucket, aggregate in self._cover(self._series[key], levels, start, end):
+                slot = bucket // step * step
+                if slot in merged:
+                    merged[slot].merge(aggregate)
+                else:
+                    merged[slot] = aggregate.copy()
+            if not merged:
+                continue
+            result.append({
+                "BuildingID": building_id,
+                "MetricType": metric,
+                "points": [_point(max(slot, start), merged[slot]) for slot in sorted(merged)],
+            })
+        return result
+
+    def _cover(
+        self, series: Dict[int, _Buckets], levels: List[int], start: int, end: int
+    ) -> Iterable[Tuple[int, Aggregate]]:
+        """Buckets exactly covering `[start, end)`: the coarsest that fit, finer ones at the edges"""
+        resolution, finer = levels[0], levels[1:]
+        inner_start = -(-start // resolution) * resolution
+        inner_end = end // resolution * resolution
+        if not finer:
+            yield from self._range(series, resolution, start, end)
+        elif inner_start >= inner_end:
+            yield from self._cover(series, finer, start, end)
+        else:
+            yield from self._cover(series, finer, start, inner_start)
+            yield from self._range(series, resolution, inner_start, inner_end)
+            yield from self._cover(series, finer, inner_end, end)
+
+    def _range(self, series: Dict[int, _Buckets], resolution: int, start: int, end: int):
+        if start < end and start < self.horizon[resolution]:
+            raise ValueError(
+                f"{resolution}s buckets before {to_iso(self.horizon[resolution])} are no longer kept; "
+                "use a coarser step or bounds aligned on it"
+            )
+        return series[resolution].range(start, end)
+
+
+def _point(slot: int, aggregate: Aggregate) -> Dict[str, Any]:
+    return {
+        "start": to_iso(slot),
+        "min": aggregate.min,
+        "max": aggregate.max,
+        "avg": aggregate.sum / aggregate.count,
+        "sum": aggregate.sum,
+        "count": aggregate.count,
+        "last": aggregate.last,
+    }
@@ -0,0 +1,156 @@
+"""
+Telemetry feed: pages `factory_iot_data` rows from the upstream GraphQL API
+in timestamp order and hands them to in-memory consumers (such as the rollup
+engine). The first sync loads the rows of the last `lookback` seconds (or the
+whole table), later syncs only fetch rows at or after the newest timestamp
+already seen.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Protocol
+
+from rollups import to_iso
+from upstream import GraphQLUpstream
+
+logger = logging.getLogger("fabric-rest-to-graphql")
+
+TELEMETRY_PAGE_QUERY = """query ($first: Int!, $after: String, $filter: factory_iot_dataFilterInput) {
+    factory_iot_datas(
+        first: $first
+        after: $after
+        filter: $filter
+        orderBy: { Timestamp: ASC }
+    ) {
+        items {
+            Timestamp
+            BuildingID
+            DeviceID
+            Location
+            MetricType
+            Value
+            Unit
+            Status
+        }
+        hasNextPage
+        endCursor
+    }
+}"""
+
+
+class TelemetryConsumer(Protocol):
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> int: ...
+
+
+class TelemetryFeedError(Exception):
+    """The upstream API refused or failed a telemetry page"""
+
+
+def _row_id(row: Dict[str, Any]) -> tuple:
+    return tuple(row.get(field) for field in ("Timestamp", "BuildingID", "DeviceID", "MetricType", "Value", "Status"))
+
+
+class TelemetryFeed:
+    """
+    Incremental reader of the telemetry table.
+
+    Args:
+        upstream: Upstream GraphQL client
+        consumers: Objects with an `ingest(rows)` method, fed every new page
+        page_size: Rows requested per page
+        lookback: Seconds of history loaded by the first sync (None loads the whole table)
+    """
+
+    def __init__(
+        self,
+        upstream: GraphQLUpstream,
+        consumers: Iterable[TelemetryConsumer],
+        page_size: int = 1000,
+        lookback: Optional[float] = None,
+    ):
+        self.upstream = upstream
+        self.consumers: List[TelemetryConsumer] = list(consumers)
+        self.page_size = page_size
+        self.lookback = lookback
+        self.watermark: Optional[str] = None
+        self.synced = False
+        self.rows_read = 0
+        # Wall-clock time (epoch seconds) of the last sync that completed, and
+        # the error of the last sync if it failed
+        self.last_sync: Optional[float] = None
+        self.last_error: Optional[str] = None
+        # Rows already ingested at the watermark timestamp; later syncs start
+        # at that timestamp (gte) so rows landing with the same value are not lost
+        self._at_watermark: set = set()
+
+    async def sync(self) -> int:
+        """Fetch every row newer than the watermark; returns the number of new rows"""
+        variables: Dict[str, Any] = {"first": self.page_size, "after": None, "filter": None}
+        if self.watermark is not None:
+            variables["filter"] = {"Timestamp": {"gte": self.watermark}}
+        elif self.lookback:
+            variables["filter"] = {"Timestamp": {"gte": to_iso(time.time() - self.lookback)}}
+        new_rows = 0
+        while True:
+            page = await self._page(variables)
+            rows = [row for row in page["items"] if _row_id(row) not in self._at_watermark]
+            self._advance(rows)
+            for consumer in self.consumers:
+                consumer.ingest(rows)
+            new_rows += len(rows)
+            if not page.get("hasNextPage") or not page.get("endCursor"):
+                break
+            variables["after"] = page["endCursor"]
+        self.rows_read += new_rows
+        self.synced = True
+        self.last_sync = time.time()
+        self.last_error = None
+        return new_rows
+
+    def sync_age(self) -> Optional[float]:
+        """Seconds since the last completed sync, or None before the first one"""
+        return None if self.last_sync is None else time.time() - self.last_sync
+
+    async def run(self, interval: float) -> None:
+        """Sync every `interval` seconds until cancelled; a failed sync is logged and retried"""
+        while True:
+            try:
+                rows = await self.sync()
+                if rows:
+                    logger.info("Telemetry feed ingested %d rows (watermark %s)", rows, self.watermark)
+            except TelemetryFeedError as e:
+                self.last_error = str(e)
+                logger.warning("Telemetry sync failed: %s", e)
+            except Exception as e:
+                # Anything else must not end the task, or the consumers silently freeze
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Telemetry sync failed")
+            await asyncio.sleep(interval)
+
+    async def _page(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.upstream.execute(TELEMETRY_PAGE_QUERY, variables)
+        if not result.ok:
+            raise TelemetryFeedError(f"{result.status_code} {result.reason}")
+        try:
+            body = result.json()
+        except ValueError:
+            raise TelemetryFeedError("upstream answer is not JSON")
+        if not isinstance(body, dict):
+            raise TelemetryFeedError("unexpected upstream answer")
+        if body.get("errors"):
+            raise TelemetryFeedError(body["errors"])
+        page = (body.get("data") or {}).get("factory_iot_datas")
+        if not isinstance(page, dict) or not isinstance(page.get("items"), list):
+            raise TelemetryFeedError("upstream answer has no factory_iot_datas items")
+        return page
+
+    def _advance(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            timestamp = row.get("Timestamp")
+            if timestamp is None:
+                continue
+            if self.watermark is None or timestamp > self.watermark:
+                self.watermark = timestamp
+                self._at_watermark = set()
+            if timestamp == self.watermark:
+                self._at_watermark.add(_row_id(row))
@@ -0,0 +1,107 @@
+"""
+Tests for the latest-value index and the sensor routes it serves
+"""
+import json
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from latest_index import LatestIndex
+from main import SENSORS_FIELDS, create_app
+from rollups import HOUR, to_iso
+from test_rollups import PagedFabric, reading
+from upstream import GraphQLUpstream
+
+ROWS = [
+    reading("2025-11-11T17:00:00.000Z", 1.0, metric="Power"),
+    reading("2025-11-11T17:05:00.000Z", 230.0, metric="Voltage"),
+    reading("2025-11-11T17:10:00.000Z", 2.0, metric="Power"),
+    reading("2025-11-11T17:02:00.000Z", 21.5, device="HVAC-01C-H2", metric="Temperature"),
+]
+
+
+def test_newest_reading_wins_whatever_the_ingest_order():
+    index = LatestIndex()
+    index.ingest(ROWS[2:])
+    index.ingest(ROWS[:2])
+    assert index.latest("EM-04A-F3")["Value"] == 2.0
+    assert [r["MetricType"] for r in index.device("EM-04A-F3")] == ["Power", "Voltage"]
+    assert [r["DeviceID"] for r in index.all()] == ["EM-04A-F3", "HVAC-01C-H2"]
+    assert index.device("UNKNOWN") == []
+
+
+def test_recent_keeps_the_newest_readings_of_any_device():
+    index = LatestIndex(recent=3)
+    index.ingest(ROWS[2:])
+    index.ingest(ROWS[:2])
+    assert [(r["DeviceID"], r["Timestamp"][11:16]) for r in index.recent()] == [
+        ("EM-04A-F3", "17:10"), ("EM-04A-F3", "17:05"), ("HVAC-01C-H2", "17:02"),
+    ]
+
+
+class NewestFirstFabric(PagedFabric):
+    """`PagedFabric` that also answers the sensor routes' `orderBy: { Timestamp: DESC }` queries"""
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if "Timestamp: DESC" not in body["query"]:
+            return super().__call__(request)
+        self.requests.append(body["variables"])
+        device_id = body["variables"].get("deviceId")
+        rows = sorted((r for r in self.rows if device_id in (None, r["DeviceID"])),
+                      key=lambda r: r["Timestamp"], reverse=True)
+        items = rows[:1] if device_id else [{k: r[k] for k in SENSORS_FIELDS} for r in rows[:10]]
+        return httpx.Response(200, json={"data": {"factory_iot_datas": {"items": items}}})
+
+
+def test_sensor_routes_answer_the_same_from_upstream_and_from_the_index():
+    fabric = NewestFirstFabric(ROWS)
+    upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric))
+    with TestClient(create_app(upstream, sensors_ttl=0, sensor_details_ttl=0, sync_interval=0,
+                               lookback_days=0)) as client:
+        from_upstream = [client.get(path).json() for path in ("/sensors", "/sensors/EM-04A-F3", "/sensors/NONE")]
+        client.portal.call(client.app.state.feed.sync)
+        sync_requests = len(fabric.requests)
+        from_index = [client.get(path).json() for path in ("/sensors", "/sensors/EM-04A-F3", "/sensors/NONE")]
+    # Only the unknown device is looked up upstream: it may have readings the index did not load
+    assert len(fabric.requests) == sync_requests + 1
+    assert from_index == from_upstream
+    sensors, details, unknown = from_index
+    assert [r["Timestamp"][11:16] for r in sensors["sensors"]] == ["17:10", "17:05", "17:02", "17:00"]
+    assert [(r["MetricType"], r["Value"]) for r in details["sensors"]] == [("Power", 2.0)]
+    assert unknown == {"sensors": []}
+
+
+def test_devices_outside_the_lookback_window_are_looked_up_upstream():
+    recent = reading(to_iso(time.time() - HOUR), 3.0, device="LIGHT-02D-I4", metric="Lux")
+    fabric = NewestFirstFabric(ROWS + [recent])
+    upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric))
+    # Default lookback: only `recent` is loaded by the sync
+    with TestClient(create_app(upstream, sensors_ttl=0, sensor_details_ttl=0, sync_interval=0)) as client:
+        before = [client.get(path).json() for path in ("/sensors", "/sensors/EM-04A-F3", "/sensors/LIGHT-02D-I4")]
+        client.portal.call(client.app.state.feed.sync)
+        assert len(client.app.state.latest) == 1
+        sync_requests = len(fabric.requests)
+        after = [client.get(path).json() for path in ("/sensors", "/sensors/EM-04A-F3", "/sensors/LIGHT-02D-I4")]
+    assert after == before
+    assert after[1]["sensors"][0]["Value"] == 2.0
+    # /sensors (one loaded row, less than a page) and EM-04A-F3 went upstream; LIGHT-02D-I4 came from the index
+    assert len(fabric.requests) == sync_requests + 2
+
+
+def test_stale_index_falls_back_to_upstream():
+    fabric = NewestFirstFabric(ROWS)
+    upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric))
+    with TestClient(create_app(upstream, sensor_details_ttl=0, sync_interval=60, lookback_days=0)) as client:
+        feed = client.app.state.feed
+        for _ in range(100):
+            if feed.synced:
+                break
+            time.sleep(0.01)
+        sync_requests = len(fabric.requests)
+        client.get("/sensors/EM-04A-F3")
+        assert len(fabric.requests) == sync_requests
+        feed.last_sync -= 3 * 60
+        assert client.get("/sensors/EM-04A-F3").json()["sensors"][0]["Value"] == 2.0
+        assert len(fabric.requests) == sync_requests + 1
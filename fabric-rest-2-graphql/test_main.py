@@ -0,0 +1,141 @@
+"""
+Tests for the REST to GraphQL facade
+"""
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from main import SENSOR_DETAILS_QUERY, create_app
+from upstream import GraphQLUpstream
+
+ROWS = [
+    {"Timestamp": "2025-11-11T17:36:24.407Z", "BuildingID": "BLD-MAR-003", "DeviceID": "EM-05B-G1"},
+    {"Timestamp": "2025-11-11T17:37:50.807Z", "BuildingID": "BLD-LYO-002", "DeviceID": "EM-04A-F3"},
+]
+
+
+class FakeFabric:
+    """Upstream stand-in recording the GraphQL requests it receives"""
+
+    def __init__(self, status_code=200, body=None, delay=0.0):
+        self.status_code = status_code
+        self.body = body if body is not None else {"data": {"factory_iot_datas": {"items": ROWS}}}
+        self.delay = delay
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(json.loads(request.content))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return httpx.Response(self.status_code, json=self.body)
+
+
+def make_client(fabric, **kwargs):
+    kwargs.setdefault("sync_interval", 0)
+    upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric))
+    return TestClient(create_app(upstream, **kwargs))
+
+
+def test_list_sensors_reshapes_items():
+    fabric = FakeFabric()
+    with make_client(fabric) as client:
+        response = client.get("/sensors")
+    assert response.status_code == 200
+    assert response.json() == {"sensors": ROWS}
+    assert "factory_iot_datas(first: 10, orderBy: { Timestamp: DESC })" in fabric.requests[0]["query"]
+
+
+def test_sensor_details_sends_device_id_variable():
+    fabric = FakeFabric()
+    with make_client(fabric) as client:
+        client.get("/sensors/EM-04A-F3")
+    assert fabric.requests == [{"query": SENSOR_DETAILS_QUERY, "variables": {"deviceId": "EM-04A-F3"}}]
+
+
+def test_responses_are_cached_per_route_ttl():
+    fabric = FakeFabric()
+    with make_client(fabric, sensors_ttl=60, sensor_details_ttl=0) as client:
+        for _ in range(3):
+            client.get("/sensors")
+            client.get("/sensors/EM-04A-F3")
+        stats = client.get("/health").json()["upstream"]
+    assert len(fabric.requests) == 1 + 3
+    assert stats["cache_hits"] == 2
+
+
+def test_graphql_errors_and_upstream_failures_are_reported():
+    with make_client(FakeFabric(body={"errors": [{"message": "boom"}]})) as client:
+        assert client.get("/sensors").json() == {"error": "GraphQL Error", "details": [{"message": "boom"}]}
+    with make_client(FakeFabric(status_code=503, body={})) as client:
+        response = client.get("/sensors")
+    assert response.status_code == 503
+    assert response.json()["error"] == "Fabric API Error"
+
+
+def test_connection_failures_timeouts_and_non_json_bodies_map_to_gateway_errors():
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    def time_out(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    def html(request):
+        return httpx.Response(200, text="<html>maintenance</html>")
+
+    for handler, status_code in ((refuse, 502), (time_out, 504), (html, 502)):
+        with make_client(handler) as client:
+            for path in ("/sensors", "/sensors/EM-04A-F3"):
+                response = client.get(path)
+                assert response.status_code == status_code
+                assert response.json()["error"] == "Fabric API Error"
+            if handler is not html:
+                assert client.post("/graphql", json={"query": "{ x }"}).status_code == status_code
+                assert client.get("/health").json()["upstream"]["upstream_errors"] == 3
+
+
+def test_errors_are_not_cached():
+    fabric = FakeFabric(body={"errors": [{"message": "throttled"}]})
+    with make_client(fabric, sensors_ttl=60) as client:
+        client.get("/sensors")
+        client.get("/sensors")
+    assert len(fabric.requests) == 2
+
+
+def test_concurrent_identical_calls_share_one_upstream_request():
+    fabric = FakeFabric(delay=0.05)
+
+    async def scenario():
+        upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric))
+        results = await asyncio.gather(
+            *(upstream.execute(SENSOR_DETAILS_QUERY, {"deviceId": "EM-04A-F3"}) for _ in range(10)),
+            upstream.execute(SENSOR_DETAILS_QUERY, {"deviceId": "HVAC-01C-H2"}),
+        )
+        await upstream.aclose()
+        return upstream.stats, results
+
+    stats, results = asyncio.run(scenario())
+    assert len(fabric.requests) == 2
+    assert stats.coalesced == 9
+    assert all(r.ok for r in results)
+
+
+def test_graphql_passthrough_streams_upstream_response():
+    fabric = FakeFabric()
+    with make_client(fabric) as client:
+        response = client.post("/graphql", json={"query": "{ factory_iot_datas { items { DeviceID } } }"})
+    assert response.status_code == 200
+    assert response.json()["data"]["factory_iot_datas"]["items"] == ROWS
+    assert fabric.requests[0]["query"] == "{ factory_iot_datas { items { DeviceID } } }"
+
+
+def test_series_requires_a_telemetry_sync():
+    with make_client(FakeFabric()) as client:
+        response = client.get("/sensors/EM-04A-F3/series")
+    assert response.status_code == 503
+
+
+def test_responses_report_server_timing():
+    with make_client(FakeFabric()) as client:
+        assert client.get("/sensors").headers["Server-Timing"].startswith("app;dur=")
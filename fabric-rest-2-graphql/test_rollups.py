@@ -0,0 +1,240 @@
+"""
+Tests for the telemetry rollups and the feed that keeps them up to date
+"""
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from main import create_app
+from rollups import DAY, HOUR, MINUTE, RollupEngine, parse_step, to_epoch, to_iso
+from telemetry_feed import TelemetryFeed
+from upstream import GraphQLUpstream
+
+
+def reading(timestamp, value, device="EM-04A-F3", metric="Power", building="BLD-LYO-002"):
+    return {
+        "Timestamp": timestamp, "BuildingID": building, "DeviceID": device, "Location": "Floor 1",
+        "MetricType": metric, "Value": value, "Unit": "kW", "Status": "OK",
+    }
+
+
+ROWS = [
+    reading("2025-11-11T17:00:10.000Z", 4.0),
+    reading("2025-11-11T17:00:50.000Z", 2.0),
+    reading("2025-11-11T17:01:30.000Z", 6.0),
+    reading("2025-11-11T18:15:00.000Z", 10.0),
+    reading("2025-11-11T18:16:00.000Z", 20.0, metric="Voltage"),
+    reading("2025-11-12T09:00:00.000Z", 1.0),
+]
+
+
+class PagedFabric:
+    """Upstream stand-in serving `ROWS`-like tables in timestamp order, with cursors"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        variables = json.loads(request.content)["variables"]
+        self.requests.append(variables)
+        since = ((variables.get("filter") or {}).get("Timestamp") or {}).get("gte")
+        rows = sorted((r for r in self.rows if since is None or r["Timestamp"] >= since), key=lambda r: r["Timestamp"])
+        offset = int(base64.b64decode(variables["after"])) if variables.get("after") else 0
+        end = offset + variables["first"]
+        page = {
+            "items": rows[offset:end],
+            "hasNextPage": end < len(rows),
+            "endCursor": base64.b64encode(str(end).encode()).decode(),
+        }
+        return httpx.Response(200, json={"data": {"factory_iot_datas": page}})
+
+
+def test_parse_step():
+    assert parse_step("300") == 5 * MINUTE
+    assert parse_step("5m") == 5 * MINUTE
+    assert parse_step("2h") == 2 * HOUR
+    with pytest.raises(ValueError):
+        parse_step("90s")
+    with pytest.raises(ValueError):
+        parse_step("soon")
+
+
+def test_minute_buckets_keep_min_max_sum_count_last():
+    rollups = RollupEngine()
+    rollups.ingest(ROWS)
+    start = to_epoch("2025-11-11T17:00:00Z")
+    [series] = rollups.series("EM-04A-F3", start, start + 2 * MINUTE, MINUTE, "Power")
+    first, second = series["points"]
+    assert first == {
+        "start": "2025-11-11T17:00:00Z", "min": 2.0, "max": 4.0, "avg": 3.0, "sum": 6.0, "count": 2, "last": 2.0,
+    }
+    assert second["count"] == 1 and second["last"] == 6.0
+
+
+def test_range_queries_use_the_coarsest_resolution_that_fits():
+    rollups = RollupEngine()
+    rollups.ingest(ROWS)
+    assert rollups.resolution_for(30 * MINUTE) == MINUTE
+    assert rollups.resolution_for(6 * HOUR) == HOUR
+    start = to_epoch("2025-11-11T00:00:00Z")
+    [power] = rollups.series("EM-04A-F3", start, start + 2 * 24 * HOUR, 24 * HOUR, "Power")
+    assert [(p["start"], p["count"], p["sum"], p["last"]) for p in power["points"]] == [
+        ("2025-11-11T00:00:00Z", 4, 22.0, 10.0),
+        ("2025-11-12T00:00:00Z", 1, 1.0, 1.0),
+    ]
+
+
+def test_unaligned_bounds_only_count_readings_inside_the_range():
+    rollups = RollupEngine()
+    rollups.ingest([
+        reading("2025-11-11T17:10:00.000Z", 1.0),
+        reading("2025-11-11T17:35:00.000Z", 2.0),
+        reading("2025-11-11T17:50:00.000Z", 4.0),
+        reading("2025-11-11T18:05:00.000Z", 8.0),
+        reading("2025-11-12T09:00:00.000Z", 16.0),
+    ])
+    start = to_epoch("2025-11-11T17:30:00Z")
+    [power] = rollups.series("EM-04A-F3", start, start + 10 * MINUTE, HOUR)
+    assert [(p["start"], p["sum"]) for p in power["points"]] == [("2025-11-11T17:30:00Z", 2.0)]
+
+    # A day step with hour and minute edges
+    [power] = rollups.series("EM-04A-F3", start, to_epoch("2025-11-12T09:00:00Z"), DAY)
+    assert [(p["start"], p["sum"]) for p in power["points"]] == [("2025-11-11T17:30:00Z", 14.0)]
+    [power] = rollups.series("EM-04A-F3", start, to_epoch("2025-11-12T09:01:00Z"), DAY)
+    assert [(p["start"], p["sum"]) for p in power["points"]] == [
+        ("2025-11-11T17:30:00Z", 14.0),
+        ("2025-11-12T00:00:00Z", 16.0),
+    ]
+    with pytest.raises(ValueError):
+        rollups.series("EM-04A-F3", start + 1, start + HOUR, HOUR)
+
+
+def test_out_of_order_rows_are_merged_incrementally():
+    rollups = RollupEngine()
+    rollups.ingest(ROWS[3:])
+    rollups.ingest(ROWS[:3])
+    start = to_epoch("2025-11-11T17:00:00Z")
+    [power] = rollups.series("EM-04A-F3", start, start + 2 * HOUR, HOUR, "Power")
+    assert [p["count"] for p in power["points"]] == [3, 1]
+    assert power["points"][0]["last"] == 6.0
+
+
+def test_feed_pages_then_only_fetches_new_rows():
+    fabric = PagedFabric(ROWS[:4])
+    rollups = RollupEngine()
+
+    async def scenario():
+        feed = TelemetryFeed(GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric)),
+                             [rollups], page_size=3)
+        first = await feed.sync()
+        fabric.rows += ROWS[4:]
+        second = await feed.sync()
+        return first, second
+
+    assert asyncio.run(scenario()) == (4, 2)
+    assert rollups.rows_ingested == len(ROWS)
+    assert fabric.requests[2]["filter"] == {"Timestamp": {"gte": "2025-11-11T18:15:00.000Z"}}
+
+
+def test_minute_and_hour_buckets_are_pruned_after_their_retention():
+    rollups = RollupEngine(retention={MINUTE: DAY, HOUR: 2 * DAY})
+    rollups.ingest([reading("2025-11-01T10:15:00.000Z", 1.0), reading("2025-11-02T10:15:00.000Z", 2.0)])
+    rollups.ingest([reading("2025-11-03T12:00:00.000Z", 4.0)])
+    buckets = rollups._series[("BLD-LYO-002", "EM-04A-F3", "Power")]
+    assert len(buckets[MINUTE].starts) == 1
+    assert len(buckets[HOUR].starts) == 2
+    assert len(buckets[DAY].starts) == 3
+
+    start = to_epoch("2025-11-01T00:00:00Z")
+    [power] = rollups.series("EM-04A-F3", start, start + 3 * DAY, DAY)
+    assert [p["sum"] for p in power["points"]] == [1.0, 2.0, 4.0]
+    with pytest.raises(ValueError):
+        rollups.series("EM-04A-F3", start, start + DAY, HOUR)
+    with pytest.raises(ValueError):
+        rollups.series("EM-04A-F3", start + 10 * MINUTE, start + DAY, DAY)
+    # Rows arriving behind the horizon only update the resolutions still kept there
+    rollups.ingest([reading("2025-11-01T11:00:00.000Z", 8.0)])
+    assert len(buckets[MINUTE].starts) == 1
+    [power] = rollups.series("EM-04A-F3", start, start + DAY, DAY)
+    assert power["points"][0]["sum"] == 9.0
+
+
+def test_first_sync_only_loads_the_lookback_window():
+    now = time.time()
+    fabric = PagedFabric([reading(to_iso(now - 10 * DAY), 1.0), reading(to_iso(now - HOUR), 2.0)])
+
+    async def scenario():
+        upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric))
+        return await TelemetryFeed(upstream, [], lookback=7 * DAY).sync()
+
+    assert asyncio.run(scenario()) == 1
+    assert "gte" in fabric.requests[0]["filter"]["Timestamp"]
+
+
+def test_series_after_a_sync_that_loaded_nothing():
+    upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(PagedFabric(ROWS)))
+    # The default lookback leaves out every reading of ROWS
+    with TestClient(create_app(upstream, sync_interval=0)) as client:
+        client.portal.call(client.app.state.feed.sync)
+        assert client.app.state.feed.watermark is None
+        assert client.get("/sensors/EM-04A-F3/series").status_code == 404
+        assert client.get("/sensors/EM-04A-F3/series", params={"to": "2025-11-12T00:00:00Z"}).status_code == 404
+
+
+def test_feed_keeps_running_after_failed_syncs():
+    fabric = PagedFabric(ROWS)
+
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    failures = [
+        refuse,
+        lambda request: httpx.Response(200, text="<html>maintenance</html>"),
+        lambda request: httpx.Response(200, json={"data": None}),
+    ]
+
+    def flaky(request):
+        if failures:
+            return failures.pop(0)(request)
+        return fabric(request)
+
+    async def scenario():
+        feed = TelemetryFeed(GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(flaky)), [])
+        task = asyncio.create_task(feed.run(0.01))
+        for _ in range(200):
+            if feed.synced:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return feed, task
+
+    feed, task = asyncio.run(scenario())
+    assert feed.synced and feed.rows_read == len(ROWS)
+    assert feed.last_sync is not None and feed.last_error is None
+    assert task.cancelled()
+
+
+def test_series_endpoint():
+    fabric = PagedFabric(ROWS)
+    upstream = GraphQLUpstream("http://fabric.test/graphql", transport=httpx.MockTransport(fabric))
+    with TestClient(create_app(upstream, sync_interval=0, lookback_days=0)) as client:
+        client.portal.call(client.app.state.feed.sync)
+        response = client.get(
+            "/sensors/EM-04A-F3/series",
+            params={"from": "2025-11-11T17:00:00Z", "to": "2025-11-11T19:00:00Z", "step": "1h"},
+        )
+        assert client.get("/sensors/EM-04A-F3/series", params={"step": "45s"}).status_code == 400
+        assert client.get("/sensors/EM-04A-F3/series", params={"from": "2025-11-11T17:00:30Z"}).status_code == 400
+        assert client.get("/sensors/UNKNOWN/series").status_code == 404
+    body = response.json()
+    assert body["resolution"] == HOUR
+    assert [(s["MetricType"], [p["count"] for p in s["points"]]) for s in body["series"]] == [
+        ("Power", [3, 1]),
+        ("Voltage", [1]),
+    ]
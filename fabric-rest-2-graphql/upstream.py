@@ -0,0 +1,142 @@
+"""
+Pooled client for the upstream Fabric GraphQL endpoint, with per-call TTL
+caching and single-flight deduplication of identical concurrent queries
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+
+@dataclass
+class UpstreamResult:
+    """Raw upstream answer, shared by every caller served from the cache or the same flight"""
+    status_code: int
+    reason: str
+    body: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+@dataclass
+class UpstreamStats:
+    """Counters exposed on `/health`"""
+    requests: int = 0
+    upstream_calls: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0
+    upstream_errors: int = 0
+
+
+def gateway_error(error: httpx.HTTPError) -> UpstreamResult:
+    """Answer standing in for an upstream call that failed without a response: 504 on timeouts, else 502"""
+    if isinstance(error, httpx.TimeoutException):
+        status_code, reason = 504, "Gateway Timeout"
+    else:
+        status_code, reason = 502, "Bad Gateway"
+    return UpstreamResult(status_code, reason, f"{type(error).__name__}: {error}".encode())
+
+
+class GraphQLUpstream:
+    """
+    Async GraphQL client shared by all facade routes.
+
+    Args:
+        endpoint: Upstream GraphQL endpoint (Fabric, or the APIM `fabric-graphql` API)
+        headers: Headers sent with every upstream request
+        timeout: Upstream timeout in seconds
+        max_connections: Size of the upstream connection pool
+        max_cache_entries: Maximum number of cached responses (LRU)
+        single_flight: Share one upstream call between identical concurrent queries
+        transport: Optional httpx transport (used by tests)
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30.0,
+        max_connections: int = 100,
+        max_cache_entries: int = 1024,
+        single_flight: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.endpoint = endpoint
+        self.max_cache_entries = max_cache_entries
+        self.single_flight = single_flight
+        self.stats = UpstreamStats()
+        self.client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json", **(headers or {})},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self._cache: "OrderedDict[str, Tuple[float, UpstreamResult]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def execute(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        ttl: float = 0.0,
+    ) -> UpstreamResult:
+        """Run a query upstream, from the cache when a fresh answer is available"""
+        self.stats.requests += 1
+        payload = {"query": query, "variables": variables or {}}
+        key = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires_at, result = cached
+            if time.monotonic() < expires_at:
+                self._cache.move_to_end(key)
+                self.stats.cache_hits += 1
+                return result
+            del self._cache[key]
+
+        if not self.single_flight:
+            result = await self._fetch(key)
+        elif key in self._inflight:
+            self.stats.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+        else:
+            future = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            result = await asyncio.shield(future)
+
+        if ttl > 0 and result.ok and b'"errors"' not in result.body:
+            self._store(key, result, ttl)
+        return result
+
+    async def stream(self, body: bytes, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Open a streamed upstream POST; the caller must close the response"""
+        request = self.client.build_request("POST", self.endpoint, content=body, headers=headers)
+        return await self.client.send(request, stream=True)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def _fetch(self, key: str) -> UpstreamResult:
+        self.stats.upstream_calls += 1
+        try:
+            response = await self.client.post(self.endpoint, content=key)
+        except httpx.HTTPError as error:
+            self.stats.upstream_errors += 1
+            return gateway_error(error)
+        return UpstreamResult(response.status_code, response.reason_phrase, response.content)
+
+    def _store(self, key: str, result: UpstreamResult, ttl: float) -> None:
+        self._cache[key] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
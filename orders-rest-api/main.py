@@ -1,5 +1,6 @@
 """Orders REST API - CRUD operations for order management"""
 import logging
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Optional
@@ -38,6 +39,15 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Report the time spent in the API as `Server-Timing: app;dur=<ms>` (forwarded by APIM)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    response.headers["Server-Timing"] = f"app;dur={(time.perf_counter() - start) * 1000:.2f}"
+    return response
+
+
 def verify_auth_header(
     request: Request, x_auth_token: Optional[str] = Header(None)
 ):
@@ -155,3 +155,10 @@ def test_auth_header_with_any_value():
     for value in test_values:
         response = client.get("/orders", headers={"X-Auth-Token": value})
         assert response.status_code == 200, f"Failed with value: {value}"
+
+
+def test_responses_report_server_timing():
+    """Every response, rejected or not, reports the time spent in the API"""
+    for headers in ({}, {"X-Auth-Token": "test"}):
+        response = client.get("/orders", headers=headers)
+        assert response.headers["Server-Timing"].startswith("app;dur=")